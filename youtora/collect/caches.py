@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from os import path
+from typing import Optional, List
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config.settings import DATA_DIR
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    headers: dict
+    encoding: Optional[str]
+    stored_at: float
+    content: bytes
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get('ETag', None)
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get('Last-Modified', None)
+
+    def to_response(self) -> requests.Response:
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = self.encoding
+        response._content = self.content
+        return response
+
+
+class HttpCache:
+    """
+    a content-addressed, size-bounded on-disk cache of http responses.
+    - each response is stored under the sha256 of its url & request headers.
+    - when the cache grows over max_bytes, the least recently used entries are evicted.
+    (an access touches the mtime of the entry)
+    """
+    CACHE_DIR = path.join(DATA_DIR, "http_cache")
+    MAX_BYTES = 10 * (10 ** 9)  # 10GB
+    # the headers worth keeping for revalidation & decoding
+    KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed on the first put
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, url: str, headers: dict) -> Optional[CachedResponse]:
+        entry_path = self._entry_path(url, headers)
+        try:
+            with open(entry_path, 'rb') as fh:
+                meta = json.loads(fh.readline())
+                content = fh.read()
+            # mark as recently used
+            os.utime(entry_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return CachedResponse(content=content, **meta)
+
+    def put(self, url: str, headers: dict, response: requests.Response) -> CachedResponse:
+        cached = CachedResponse(url=url,
+                                status_code=response.status_code,
+                                headers={
+                                    key: response.headers[key]
+                                    for key in self.KEPT_HEADERS
+                                    if key in response.headers
+                                },
+                                encoding=response.encoding,
+                                stored_at=time.time(),
+                                content=response.content)
+        self._write(self._entry_path(url, headers), cached)
+        return cached
+
+    def refresh(self, url: str, headers: dict, cached: CachedResponse) -> CachedResponse:
+        """
+        reset the age of an entry, after the server said it has not been modified.
+        """
+        cached.stored_at = time.time()
+        self._write(self._entry_path(url, headers), cached)
+        return cached
+
+    def _write(self, entry_path: str, cached: CachedResponse):
+        meta = {
+            'url': cached.url,
+            'status_code': cached.status_code,
+            'headers': cached.headers,
+            'encoding': cached.encoding,
+            'stored_at': cached.stored_at
+        }
+        # write to a temp file first, so that readers never see a half-written entry
+        tmp_path = "{}.{}.tmp".format(entry_path, threading.get_ident())
+        with open(tmp_path, 'wb') as fh:
+            fh.write(json.dumps(meta).encode("utf-8") + b"\n")
+            fh.write(cached.content)
+        with self._lock:
+            old_size = path.getsize(entry_path) if path.exists(entry_path) else 0
+            os.replace(tmp_path, entry_path)
+            self._add_bytes(path.getsize(entry_path) - old_size)
+
+    def _add_bytes(self, delta: int):
+        """
+        must be called with the lock held.
+        """
+        if self._total_bytes is None:
+            self._total_bytes = sum(entry.stat().st_size for entry in self._scan_entries())
+        else:
+            self._total_bytes += delta
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """
+        evict the least recently used entries, until the cache shrinks to 90% of max_bytes.
+        must be called with the lock held.
+        """
+        logger = logging.getLogger("_evict")
+        entries = sorted(self._scan_entries(), key=lambda entry: entry.stat().st_mtime)
+        evicted = 0
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._total_bytes -= size
+            evicted += 1
+        logger.info("evicted:{} entries:total_bytes={}".format(evicted, self._total_bytes))
+
+    def _scan_entries(self) -> List[os.DirEntry]:
+        return [
+            entry
+            for entry in os.scandir(self.cache_dir)
+            # the ones being written are not entries yet
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+
+    def _entry_path(self, url: str, headers: dict) -> str:
+        key_src = json.dumps([url, sorted(headers.items())])
+        key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+        return path.join(self.cache_dir, key)
@@ -1,15 +1,34 @@
 # the runners. to be accessed by django console.
+import heapq
 import logging
+import platform
 import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from os import getpid
+from typing import Dict, List, Optional, Tuple, Type
 
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from djongo import models
+from pymongo import UpdateOne
 
+from youtora.collect.fields import CompressedTextField
 from youtora.collect.scrapers import (
+    DriverPool,
     ChannelRawScraper,
     VideoRawScraper,
     TracksRawScraper,
     IdiomRawScraper
 )
+from youtora.collect.models import ChannelRaw, VideoRaw, TracksRaw, IdiomRaw
+from youtora.collect.queues import ScrapeQueue, LeaseHeartbeat
+from youtora.collect.schedulers import ScrapeScheduler, Signals
+from youtora.collect.writers import BulkRawWriter
+from youtora.refine.dataclasses import Caption
 from youtora.refine.extractors import CaptionExtractor, ChannelExtractor
 
 # logs to standard out, logging level is at info
@@ -24,18 +43,96 @@ class ScrapeYouTubeRaws:
     ]
 
     @classmethod
-    def exec(cls, channel_id: str, lang_code: str, os: str = "mac"):
+    def exec(cls, channel_id: str, lang_code: str, os: str = "mac",
+             video_workers: int = VideoRawScraper.MAX_WORKERS,
+             tracks_in_flight: int = TracksRawScraper.MAX_IN_FLIGHT,
+             incremental: bool = False,
+             stale_after: Optional[timedelta] = None,
+             browserless: bool = False):
         """
         scrapes and saves raw data in the following order:
-        1. TracksRaw
+        1. ChannelRaw
         2. VideoRaw (which includes CaptionsRaw)
-        3. ChannelRaw
-        channel_id raw is saved at the end.
+        3. TracksRaw
+        tracks raws are downloaded concurrently, across videos, while video raws are being scraped.
+        :param video_workers: the maximum number of videos to scrape at a time.
+        :param tracks_in_flight: the maximum number of caption downloads in flight at a time.
+        :param incremental: if True, only the videos that are not stored yet are scraped.
+        :param stale_after: in incremental mode, stored videos scraped longer ago than this are re-scraped.
+        :param browserless: if True, the channel is scraped over http, without chrome.
         """
         assert lang_code in cls.LANG_CODES
-        logger = logging.getLogger("exec")
         # scrape and store channel_id raw
-        channel_raw = ChannelRawScraper.scrape(channel_id, lang_code, os)
+        if browserless:
+            channel_raw = ChannelRawScraper.scrape_browserless(channel_id, lang_code)
+        else:
+            channel_raw = ChannelRawScraper.scrape(channel_id, lang_code, os)
+        cls._exec_channel_raw(channel_raw, video_workers, tracks_in_flight, incremental, stale_after)
+
+    @classmethod
+    def exec_multi(cls, channels_tsv_path: str, os: str = "mac",
+                   num_drivers: int = ChannelRawScraper.NUM_DRIVERS,
+                   max_pages: int = DriverPool.MAX_PAGES,
+                   video_workers: int = VideoRawScraper.MAX_WORKERS,
+                   tracks_in_flight: int = TracksRawScraper.MAX_IN_FLIGHT,
+                   incremental: bool = False,
+                   stale_after: Optional[timedelta] = None,
+                   browserless: bool = False):
+        """
+        scrapes and saves raw data of all the channels listed in a tsv file.
+        channel raws are scraped in parallel across a pool of warm drivers, while the video raws & tracks raws
+        of the channels scraped so far are being scraped.
+        :param channels_tsv_path: a tsv of channel_id, lang_code pairs. one pair per line.
+        :param num_drivers: the number of drivers to keep in the pool.
+        :param max_pages: a driver is recycled after loading this many pages.
+        """
+        channels = cls._load_channels(channels_tsv_path)
+        for channel_raw in ChannelRawScraper.scrape_multi(channels, os, num_drivers, max_pages, browserless):
+            cls._exec_channel_raw(channel_raw, video_workers, tracks_in_flight, incremental, stale_after)
+
+    @classmethod
+    def _load_channels(cls, channels_tsv_path: str) -> List[Tuple[str, str]]:
+        """
+        e.g. (tab-separated)
+        UCZ2bu0qutTOM0tHYa_jkIwg    en
+        lines that are empty or start with # are ignored.
+        """
+        channels = list()
+        with open(channels_tsv_path, 'r') as fh:
+            for line in fh:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                channel_id, lang_code = line.strip().split("\t")
+                assert lang_code in cls.LANG_CODES
+                channels.append((channel_id.strip(), lang_code.strip()))
+        return channels
+
+    @classmethod
+    def _exec_channel_raw(cls, channel_raw: ChannelRaw, video_workers: int, tracks_in_flight: int,
+                          incremental: bool, stale_after: Optional[timedelta]):
+        """
+        saves the channel raw, and scrapes and saves the video raws & tracks raws of the channel.
+        """
+        cls._save_channel_raw(channel_raw)
+        # scrape and store video raws, and feed the captions of the valid ones to the tracks scraper
+        vid_id_list = ChannelExtractor.parse(channel_raw).vid_id_list
+        if incremental:
+            vid_id_list = cls._filter_new_or_stale(vid_id_list, stale_after)
+        with BulkRawWriter(VideoRaw) as vid_raw_writer, BulkRawWriter(TracksRaw) as tracks_raw_writer:
+            vid_raw_gen = VideoRawScraper.scrape_multi(vid_id_list, channel_raw.id, video_workers)
+            caption_gen = (
+                caption
+                for vid_raw in vid_raw_gen
+                if vid_raw_writer.add(vid_raw)  # skip the invalid ones
+                for caption in CaptionExtractor.parse(vid_raw)
+            )
+            # scrape and store tracks raws
+            for tracks_raw in TracksRawScraper.scrape_multi(caption_gen, tracks_in_flight):
+                tracks_raw_writer.add(tracks_raw)
+
+    @classmethod
+    def _save_channel_raw(cls, channel_raw: ChannelRaw):
+        logger = logging.getLogger("_save_channel_raw")
         try:
             channel_raw.clean_fields()
             channel_raw.validate_unique()
@@ -46,43 +143,313 @@ class ScrapeYouTubeRaws:
         # just save it for now
         channel_raw.save()
         logger.info("channel_raw saved:{}".format(str(channel_raw)))
-        # scrape and store video raws (which will save caption raws)
-        vid_id_list = ChannelExtractor.parse(channel_raw).vid_id_list
-        vid_raw_gen = VideoRawScraper.scrape_multi(vid_id_list, channel_raw.id)
-        for vid_idx, vid_raw in enumerate(vid_raw_gen):
-            try:
-                # try validating video
-                vid_raw.clean_fields()
-                vid_raw.validate_unique()
-            except ValidationError as ve:
-                logger.warning(str(ve))
-                logger.warning("SKIP:vid_raw:" + vid_raw.id)
+
+    @classmethod
+    def _filter_new_or_stale(cls, vid_id_list: List[str],
+                             stale_after: Optional[timedelta]) -> List[str]:
+        """
+        diff the scraped uploads list against the video raws already stored, with a single query.
+        :param vid_id_list: the ids of all the uploaded videos of a channel
+        :param stale_after: if given, stored videos scraped longer ago than this are considered stale.
+        :return: the ids of the videos to scrape. the stale ones are overwritten when saved.
+        """
+        logger = logging.getLogger("_filter_new_or_stale")
+        stored = dict(VideoRaw.objects.filter(_id__in=vid_id_list).values_list('_id', 'scraped_at'))
+        stale_vid_ids = set()
+        if stale_after is not None:
+            stale_before = timezone.now() - stale_after
+            stale_vid_ids = {
+                vid_id
+                for vid_id, scraped_at in stored.items()
+                # the ones stored before scraped_at was recorded are stale as well
+                if not scraped_at or scraped_at < stale_before
+            }
+        to_scrape = [
+            vid_id
+            for vid_id in vid_id_list
+            if vid_id not in stored or vid_id in stale_vid_ids
+        ]
+        logger.info("incremental:(new={}, stale={}, skipped={}, total={})"
+                    .format(len(to_scrape) - len(stale_vid_ids), len(stale_vid_ids),
+                            len(vid_id_list) - len(to_scrape), len(vid_id_list)))
+        return to_scrape
+
+
+class ScrapeYouTubeJobs:
+    """
+    scrapes youtube raws through the persistent scrape queue, one job per channel, video and caption.
+    each raw is saved before its job is marked as done, so an interrupted run can be resumed
+    from where it stopped, with resume().
+    any number of processes, on any number of machines, can work on the same queue with run().
+    - videos that were scraped by an earlier run are not queued again.
+    - VideoRaw._id and TracksRaw.caption_id are the idempotency keys: a job whose raw is already stored
+    is not scraped again, and raws are upserted, so a job that is run twice (e.g. after its lease expired)
+    does not store duplicates.
+    """
+    NUM_WORKERS = 4
+    # seconds to wait when there is no pending job, but some are still being scraped (and may queue more)
+    IDLE_WAIT = 1.0
+    # ranks the jobs queued by the jobs done
+    _scheduler = ScrapeScheduler()
+
+    @classmethod
+    def exec(cls, channel_id: str, lang_code: str, os: str = "mac",
+             num_workers: int = NUM_WORKERS,
+             browserless: bool = False):
+        assert lang_code in ScrapeYouTubeRaws.LANG_CODES
+        ScrapeQueue.enqueue("channel", channel_id, {'channel_id': channel_id, 'lang_code': lang_code}, reset=True)
+        cls.run(os, num_workers, browserless)
+
+    @classmethod
+    def exec_multi(cls, channels_tsv_path: str, os: str = "mac",
+                   num_workers: int = NUM_WORKERS,
+                   browserless: bool = False):
+        channels = ScrapeYouTubeRaws._load_channels(channels_tsv_path)
+        ScrapeQueue.enqueue_many("channel", [
+            (channel_id, {'channel_id': channel_id, 'lang_code': lang_code})
+            for channel_id, lang_code in channels
+        ], reset=True)
+        cls.run(os, num_workers, browserless)
+
+    @classmethod
+    def resume(cls, os: str = "mac", num_workers: int = NUM_WORKERS, browserless: bool = False):
+        """
+        continue an interrupted run. the jobs it left leased are queued again once their leases expire,
+        while the jobs leased by the workers still running, here or on other machines, are left to them.
+        """
+        logger = logging.getLogger("resume")
+        logger.info("requeued:{} expired jobs".format(ScrapeQueue.requeue_expired()))
+        cls.run(os, num_workers, browserless)
+
+    @classmethod
+    def run(cls, os: str, num_workers: int, browserless: bool,
+            lease_secs: int = ScrapeQueue.LEASE_SECS,
+            forever: bool = False):
+        """
+        work on the queue with num_workers threads, until there is no job left.
+        :param lease_secs: a job leased by this process is queued again if this process
+        stops renewing its lease for this many seconds.
+        :param forever: if True, keep waiting for jobs to be queued instead of returning.
+        """
+        logger = logging.getLogger("run")
+        # unique across the machines and the processes working on the queue
+        worker_name = "{}:{}".format(platform.node(), getpid())
+        with LeaseHeartbeat(lease_secs) as heartbeat, \
+                ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix=cls.__name__) as executor:
+            futures = [
+                executor.submit(cls._work, "{}:{}".format(worker_name, idx), os, browserless,
+                                heartbeat, forever)
+                for idx in range(num_workers)
+            ]
+            for future in futures:
+                future.result()
+        logger.info("jobs:{}".format(ScrapeQueue.get_counts()))
+
+    @classmethod
+    def _work(cls, owner: str, os: str, browserless: bool, heartbeat: LeaseHeartbeat, forever: bool):
+        logger = logging.getLogger("_work")
+        while True:
+            job = ScrapeQueue.lease(owner, heartbeat.lease_secs)
+            if job is None:
+                ScrapeQueue.requeue_expired()
+                if not forever and not ScrapeQueue.has_leased():
+                    return
+                time.sleep(cls.IDLE_WAIT)
                 continue
+            heartbeat.hold(job)
+            try:
+                cls._scrape_job(job, os, browserless)
+            except Exception as e:
+                # whatever went wrong, it is recorded on the job
+                ScrapeQueue.fail(job, repr(e))
             else:
-                # this video has been validated
-                vid_raw.save()
-                logger.info("video_raw saved: #{}".format(vid_idx + 1))
-                # scrape and store tracks raws
-                captions = CaptionExtractor.parse(vid_raw)
-                tracks_raw_gen = TracksRawScraper.scrape_multi(captions)
-                for track_idx, tracks_raw in enumerate(tracks_raw_gen):
-                    try:
-                        tracks_raw.clean_fields()
-                        tracks_raw.validate_unique()  # must do this before saving
-                    except ValidationError as ve:
-                        logger.warning(str(ve))
-                        logger.warning("SKIP:tracks_raw:" + tracks_raw.id)
-                        continue
-                    else:
-                        # this tracks_raw has been validated
-                        tracks_raw.save()
-                        logger.info("tracks_raw saved #{}".format(track_idx + 1))
+                ScrapeQueue.complete(job)
+                logger.info("done:{}".format(job['_id']))
+            finally:
+                heartbeat.release(job)
+
+    @classmethod
+    def _scrape_job(cls, job: dict, os: str, browserless: bool):
+        """
+        scrape & save the raw of the job, and queue the jobs that follow from it.
+        """
+        logger = logging.getLogger("_scrape_job")
+        payload = job['payload']
+        if job['kind'] == "channel":
+            if browserless:
+                channel_raw = ChannelRawScraper.scrape_browserless(payload['channel_id'], payload['lang_code'])
+            else:
+                channel_raw = ChannelRawScraper.scrape(payload['channel_id'], payload['lang_code'], os)
+            ScrapeYouTubeRaws._save_channel_raw(channel_raw)
+            channel = ChannelExtractor.parse(channel_raw)
+            ScrapeQueue.enqueue_many("video", [
+                # subs are passed on, for ranking the captions of the video
+                (vid_id, {'vid_id': vid_id, 'channel_id': channel_raw.id, 'subs': channel.subs})
+                for vid_id in channel.vid_id_list
+            ], priority=cls._scheduler.score(Signals(subs=channel.subs)))
+        elif job['kind'] == "video":
+            vid_raw = VideoRaw.objects.filter(_id=payload['vid_id']).first()
+            if vid_raw is None:
+                vid_raw = VideoRawScraper.scrape(payload['vid_id'], payload['channel_id'])
+                cls._upsert(vid_raw)
+            else:
+                logger.info("already stored:{}".format(vid_raw.id))
+            # queued again in case the video was stored, but its captions were not queued
+            ScrapeQueue.enqueue_many("caption", [
+                (caption.id, asdict(caption))
+                for caption in CaptionExtractor.parse(vid_raw)
+            ], priority=cls._scheduler.score(cls._get_caption_signals(vid_raw, payload.get('subs'))))
+        elif job['kind'] == "caption":
+            if TracksRaw.objects.filter(caption_id=payload['id'], raw_xml__isnull=False).exists():
+                logger.info("already stored:{}".format(payload['id']))
+                return
+            tracks_raw = TracksRawScraper.scrape(Caption(**payload))
+            if tracks_raw.raw_xml is None:
+                # e.g. throttled. failed, so that it is retried up to MAX_ATTEMPTS, with the error recorded
+                raise ValueError("raw_xml not downloaded:" + payload['id'])
+            cls._upsert(tracks_raw)
+        else:
+            raise ValueError("Not a valid kind:" + job['kind'])
+
+    @classmethod
+    def _get_caption_signals(cls, vid_raw: VideoRaw, subs: Optional[int]) -> Signals:
+        """
+        read straight from the video info, so that a video without the info VideoExtractor needs
+        does not keep its captions from being queued. the signals missing are None.
+        """
+        video_info = vid_raw.video_info or dict()
+        upload_date = video_info.get('upload_date')
+        try:
+            publish_date = datetime.strptime(upload_date, "%Y%m%d").date() if upload_date else None
+        except ValueError:
+            publish_date = None
+        return Signals(subs=subs, views=video_info.get('view_count'), publish_date=publish_date)
+
+    @classmethod
+    def _upsert(cls, raw: models.Model):
+        """
+        write a raw immediately, keyed by its _id.
+        """
+        with BulkRawWriter(type(raw)) as writer:
+            writer.add(raw)
+        if writer.failures:
+            raise ValueError(writer.failures[0][1])
+
+
+class ScheduleScrapes:
+    """
+    ranks the pending scrape jobs with ScrapeScheduler, and reports the planned order and its cost.
+    """
+
+    @classmethod
+    def exec(cls, weights: Optional[Dict[str, float]] = None, dry_run: bool = False, top: int = 20):
+        """
+        :param weights: the weights of the signals, to override ScrapeScheduler.WEIGHTS with.
+        :param dry_run: if True, the priorities are only reported, and not stored.
+        :param top: the number of jobs to report, from the top of the planned order.
+        """
+        logger = logging.getLogger("exec")
+        scheduler = ScrapeScheduler(weights)
+        job_cnts = Counter()
+        request_cnts = Counter()
+        scored = list()
+        for job, score in scheduler.prioritise(dry_run):
+            job_cnts[job['kind']] += 1
+            request_cnts[job['kind']] += scheduler.estimate_requests(job)
+            scored.append((score, job['_id']))
+        logger.info("planned order{}:(weights={})".format(" (dry run)" if dry_run else "", scheduler.weights))
+        for rank, (score, job_id) in enumerate(heapq.nlargest(top, scored), start=1):
+            logger.info("{}. {:.3f} {}".format(rank, score, job_id))
+        for kind in ScrapeQueue.KINDS:
+            logger.info("{}:(jobs={}, est_requests={})".format(kind, job_cnts[kind], request_cnts[kind]))
+        logger.info("total:(jobs={}, est_requests={})".format(sum(job_cnts.values()), sum(request_cnts.values())))
 
 
 class ScrapeIdiomRaws:
     @classmethod
-    def exec(cls):
+    def exec(cls, max_workers: int = IdiomRawScraper.MAX_WORKERS):
+        """
+        scrapes and saves the idioms in slide.tsv that are not stored yet.
+        :param max_workers: the maximum number of idioms to scrape at a time.
+        """
         logger = logging.getLogger("run")
-        for idiom_raw in IdiomRawScraper.scrape_multi():
-            idiom_raw.save()
-            logger.info("idiom_raw saved:[{}]".format(str(idiom_raw)))
+        stored_ids = set(IdiomRaw.objects.values_list('_id', flat=True))
+        logger.info("skipping:{} idioms already stored".format(len(stored_ids)))
+        with BulkRawWriter(IdiomRaw) as idiom_raw_writer:
+            for idiom_raw in IdiomRawScraper.scrape_multi(stored_ids, max_workers):
+                if idiom_raw_writer.add(idiom_raw):
+                    logger.info("idiom_raw buffered:[{}]".format(str(idiom_raw)))
+
+
+class CompressRaws:
+    """
+    compresses, in place, the raw html/xml blobs that were stored as plain strings
+    before they were made CompressedTextFields.
+    """
+    MODELS = (ChannelRaw, VideoRaw, TracksRaw, IdiomRaw)
+    BATCH_SIZE = 100
+
+    @classmethod
+    def exec(cls):
+        for model in cls.MODELS:
+            for field in model._meta.concrete_fields:
+                if isinstance(field, CompressedTextField):
+                    cls._compress_field(model, field)
+
+    @classmethod
+    def _compress_field(cls, model: Type[models.Model], field: CompressedTextField):
+        logger = logging.getLogger("_compress_field")
+        collection = BulkRawWriter.get_collection(model)
+        # only the plain strings need compressing
+        query = {field.column: {'$type': "string"}}
+        total = collection.count_documents(query)
+        done = 0
+        batch = list()
+        for doc in collection.find(query, projection={field.column: True}):
+            batch.append(UpdateOne({'_id': doc['_id']},
+                                   {'$set': {field.column: field.compress(doc[field.column])}}))
+            if len(batch) >= cls.BATCH_SIZE:
+                collection.bulk_write(batch, ordered=False)
+                done += len(batch)
+                batch = list()
+                logger.info("compressed:{}.{}:{}/{}".format(model.__name__, field.name, done, total))
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            done += len(batch)
+        logger.info("compressed:{}.{}:{}/{}".format(model.__name__, field.name, done, total))
+
+
+class CompactVideoInfos:
+    """
+    shrinks, in place, the video infos that were stored as full youtube_dl dumps, down to the keys
+    VideoRawScraper.project_video_info keeps.
+    """
+    BATCH_SIZE = 100
+
+    @classmethod
+    def exec(cls):
+        logger = logging.getLogger("exec")
+        collection = BulkRawWriter.get_collection(VideoRaw)
+        total = collection.estimated_document_count()
+        seen = 0
+        compacted = 0
+        batch = list()
+        for doc in collection.find(dict(), projection={'video_info': True}):
+            seen += 1
+            video_info = doc.get('video_info')
+            if not video_info:
+                continue
+            projected = VideoRawScraper.project_video_info(video_info)
+            if projected == video_info:
+                # already compact
+                continue
+            batch.append(UpdateOne({'_id': doc['_id']}, {'$set': {'video_info': projected}}))
+            if len(batch) >= cls.BATCH_SIZE:
+                collection.bulk_write(batch, ordered=False)
+                compacted += len(batch)
+                batch = list()
+                logger.info("compacted:{}:(seen={}/{})".format(compacted, seen, total))
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            compacted += len(batch)
+        logger.info("compacted:{}:(seen={}/{})".format(compacted, seen, total))
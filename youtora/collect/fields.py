@@ -0,0 +1,66 @@
+import zlib
+from typing import Optional, Union
+
+from django.db.models.query_utils import DeferredAttribute
+from djongo import models
+
+
+class CompressedTextAttribute(DeferredAttribute):
+    """
+    holds the compressed bytes loaded from the db, and decompresses them on the first access.
+    unlike DeferredAttribute, this is a data descriptor, so that every access goes through __get__.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = self.field.decompress(value)
+            instance.__dict__[self.field.attname] = value  # cache the decompressed one
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """
+    a text field that is stored as zlib-compressed bytes.
+    - compressed on write, decompressed lazily on the first attribute access.
+    - plain strings stored before the field was compressed are read as they are.
+      run compress_raws to compress them in place.
+    """
+    descriptor_class = CompressedTextAttribute
+    # 6 is zlib's default. a good trade-off between speed & ratio for html.
+    LEVEL = 6
+    ENCODING = "utf-8"
+
+    @classmethod
+    def compress(cls, text: str) -> bytes:
+        return zlib.compress(text.encode(cls.ENCODING), cls.LEVEL)
+
+    @classmethod
+    def decompress(cls, blob: Union[bytes, memoryview]) -> str:
+        return zlib.decompress(blob).decode(cls.ENCODING)
+
+    def pre_save(self, model_instance, add):
+        # read the raw value, so that blobs that were never accessed are not decompressed just to be saved
+        return model_instance.__dict__.get(self.attname)
+
+    def from_db_value(self, value, expression, connection) -> Optional[Union[bytes, str]]:
+        # decompressed lazily, by the descriptor
+        return value
+
+    def to_python(self, value) -> Optional[str]:
+        if isinstance(value, (bytes, memoryview)):
+            return self.decompress(value)
+        return super().to_python(value)
+
+    def get_prep_value(self, value) -> Optional[bytes]:
+        if value is None or isinstance(value, bytes):
+            # None, or already compressed
+            return value
+        if isinstance(value, memoryview):
+            return bytes(value)
+        return self.compress(str(value))
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class TokenBucket:
+    rate: float  # tokens per second
+    tokens: float
+    updated: float  # when the tokens were last refilled
+    paused_until: float = 0.0  # no tokens are handed out until then (e.g. Retry-After)
+
+
+class HostRateLimiter:
+    """
+    an adaptive token bucket per host, to be shared across threads.
+    the rate of a host increases additively on every success, and decreases multiplicatively
+    when the host throttles us (429 / Retry-After), so that we run as fast as each host allows.
+    """
+    INIT_RATE = 5.0  # requests per second
+    MIN_RATE = 0.2
+    MAX_RATE = 50.0
+    BURST = 5  # the maximum number of tokens a bucket can hold
+    INCREASE_STEP = 0.1  # added to the rate on success
+    DECREASE_FACTOR = 0.5  # multiplied to the rate on throttle
+
+    def __init__(self, init_rate: float = INIT_RATE,
+                 min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE,
+                 burst: int = BURST):
+        self.init_rate = init_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        """
+        blocks until a request can be sent to the host.
+        """
+        while True:
+            with self._lock:
+                bucket = self._refill(host)
+                if bucket.paused_until <= bucket.updated and bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                wait = max(bucket.paused_until - bucket.updated, (1 - bucket.tokens) / bucket.rate)
+            time.sleep(wait)
+
+    def on_success(self, host: str):
+        with self._lock:
+            bucket = self._refill(host)
+            bucket.rate = min(self.max_rate, bucket.rate + self.INCREASE_STEP)
+
+    def on_throttle(self, host: str, retry_after: Optional[float] = None):
+        logger = logging.getLogger("on_throttle")
+        with self._lock:
+            bucket = self._refill(host)
+            bucket.rate = max(self.min_rate, bucket.rate * self.DECREASE_FACTOR)
+            bucket.tokens = 0
+            if retry_after:
+                bucket.paused_until = max(bucket.paused_until, bucket.updated + retry_after)
+            logger.warning("throttled:{}:(rate={:.2f}/s, retry_after={})".format(host, bucket.rate, retry_after))
+
+    def get_rate(self, host: str) -> float:
+        with self._lock:
+            return self._refill(host).rate
+
+    def _refill(self, host: str) -> TokenBucket:
+        """
+        must be called with the lock held.
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(host, None)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.init_rate, tokens=self.burst, updated=now)
+            self._buckets[host] = bucket
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+        bucket.updated = now
+        return bucket
@@ -0,0 +1,50 @@
+import copy
+import timeit
+from os import path
+from unittest.mock import patch
+
+import youtube_dl
+from django.core.management.base import BaseCommand
+from youtube_dl.extractor.youtube import YoutubeIE
+
+from youtora.collect.scrapers import VideoRawScraper
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "..", "..", "tests", "fixtures")
+
+
+class Command(BaseCommand):
+    HELP = 'benchmark the per-video cost of youtube_dl.extract_info, before & after reusing the YoutubeDL'
+    VID_ID = "0IAPZzGSbME"
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--num_videos', type=int, default=100,
+                            help="the number of videos to simulate")
+
+    def handle(self, *args, **options):
+        num_videos = options['num_videos']
+        # the network is left out: the extractor returns the info of a recorded watch page,
+        # so that everything extract_info does around the download is timed
+        # (building the YoutubeDL, finding and initialising the extractor, processing the result).
+        with open(path.join(FIXTURES_DIR, "watch_page.html"), 'r') as fh:
+            video_info = VideoRawScraper._ext_video_info(self.VID_ID, fh.read())
+        # a format for process_video_result to select
+        video_info['formats'] = [{'format_id': "18", 'url': "https://example.com/18.mp4", 'ext': "mp4"}]
+        vid_url = VideoRawScraper.VID_URL_FORMAT.format(self.VID_ID)
+        with patch.object(YoutubeIE, '_real_extract', side_effect=lambda *_: copy.deepcopy(video_info)):
+            # before: a new YoutubeDL for every video
+            before = timeit.timeit(lambda: self._extract_new(vid_url), number=num_videos) / num_videos
+            # after: a YoutubeDL reused across videos
+            VideoRawScraper.get_ydl()  # the first video pays the setup cost
+            after = timeit.timeit(lambda: self._extract_reused(vid_url), number=num_videos) / num_videos
+        print("per-video extract_info cost, without the network (n={}):".format(num_videos))
+        print("before: {:.3f}ms".format(before * 1000))
+        print("after: {:.3f}ms".format(after * 1000))
+
+    @staticmethod
+    def _extract_new(vid_url: str) -> dict:
+        with youtube_dl.YoutubeDL(VideoRawScraper.VIDEO_DL_OPTS) as ydl:
+            return ydl.extract_info(url=vid_url, download=False)
+
+    @staticmethod
+    def _extract_reused(vid_url: str) -> dict:
+        return VideoRawScraper.get_ydl().extract_info(url=vid_url, download=False)
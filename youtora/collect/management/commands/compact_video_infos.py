@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from youtora.collect.facades import CompactVideoInfos
+
+
+class Command(BaseCommand):
+    HELP = 'shrink, in place, the video infos stored as full youtube_dl dumps'
+
+    def handle(self, *args, **options):
+        CompactVideoInfos.exec()
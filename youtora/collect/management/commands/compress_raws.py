@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from youtora.collect.facades import CompressRaws
+
+
+class Command(BaseCommand):
+    HELP = 'compress, in place, the raw html/xml blobs stored before they were compressed'
+
+    def handle(self, *args, **options):
+        CompressRaws.exec()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from youtora.collect.facades import ScheduleScrapes
+from youtora.collect.schedulers import ScrapeScheduler
+
+
+class Command(BaseCommand):
+    HELP = 'rank the pending scrape jobs, and print the planned order with the estimated request counts'
+
+    def add_arguments(self, parser):
+        # optional arguments
+        parser.add_argument('--dry_run', action='store_true',
+                            help="print the planned order, without storing the priorities")
+        parser.add_argument('--top', type=int, default=20,
+                            help="the number of jobs to print, from the top of the planned order")
+        parser.add_argument('--weights', type=str,
+                            help="the weights of the signals to override, e.g. subs=2,staleness=0."
+                                 " the signals are: " + ", ".join(ScrapeScheduler.WEIGHTS))
+
+    def handle(self, *args, **options):
+        weights = dict()
+        if options['weights']:
+            for pair in options['weights'].split(","):
+                name, weight = pair.split("=")
+                if name not in ScrapeScheduler.WEIGHTS:
+                    raise CommandError("Not a valid signal:" + name)
+                weights[name] = float(weight)
+        ScheduleScrapes.exec(weights, dry_run=options['dry_run'], top=options['top'])
@@ -1,6 +1,17 @@
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand, CommandError
 
-from youtora.collect.facades import ScrapeYouTubeRaws, ScrapeIdiomRaws
+from youtora.collect.caches import HttpCache
+from youtora.collect.facades import ScrapeYouTubeRaws, ScrapeYouTubeJobs, ScrapeIdiomRaws
+from youtora.collect.scrapers import (
+    Scraper,
+    DriverPool,
+    ChannelRawScraper,
+    VideoRawScraper,
+    TracksRawScraper,
+    IdiomRawScraper
+)
 
 
 class Command(BaseCommand):
@@ -17,20 +28,97 @@ class Command(BaseCommand):
                             help="the channel id of the channel to be scraped")
         parser.add_argument('-l', '--lang_code', type=str,
                             help="the language of the channel")
+        parser.add_argument('-f', '--channels_tsv', type=str,
+                            help="the path to a tsv of channel_id, lang_code pairs to scrape in batch")
+        parser.add_argument('--num_drivers', type=int, default=ChannelRawScraper.NUM_DRIVERS,
+                            help="the number of warm drivers to scrape the channels in the batch with")
+        parser.add_argument('--max_pages', type=int, default=DriverPool.MAX_PAGES,
+                            help="the number of pages after which a driver is recycled")
+        parser.add_argument('--browserless', action='store_true',
+                            help="scrape the channels over http, without chrome")
+        parser.add_argument('--use_cache', action='store_true',
+                            help="cache the http responses on disk, under DATA_DIR")
+        parser.add_argument('--keep_full_pages', action='store_true',
+                            help="for debugging. store the full pages, instead of the payloads the extractors need")
+        parser.add_argument('--full_video_info', action='store_true',
+                            help="store the full video info, instead of the keys the refine stage reads")
+        parser.add_argument('--single_fetch', action='store_true',
+                            help="fetch each watch page once, and get the video info from it without youtube_dl")
+        parser.add_argument('--video_workers', type=int, default=VideoRawScraper.MAX_WORKERS,
+                            help="the maximum number of videos to scrape at a time")
+        parser.add_argument('--tracks_in_flight', type=int, default=TracksRawScraper.MAX_IN_FLIGHT,
+                            help="the maximum number of caption downloads in flight at a time")
+        parser.add_argument('--incremental', action='store_true',
+                            help="only scrape the videos that are not stored yet")
+        parser.add_argument('--stale_after_days', type=int,
+                            help="with --incremental, re-scrape the videos scraped longer ago than this")
+        parser.add_argument('--idiom_workers', type=int, default=IdiomRawScraper.MAX_WORKERS,
+                            help="the maximum number of idioms to scrape at a time")
+        parser.add_argument('--queued', action='store_true',
+                            help="scrape through the persistent job queue, so that the run can be resumed")
+        parser.add_argument('--resume', action='store_true',
+                            help="resume the queued run that was interrupted. the jobs it left leased"
+                                 " are picked up once their leases expire")
+        parser.add_argument('--queue_workers', type=int, default=ScrapeYouTubeJobs.NUM_WORKERS,
+                            help="with --queued or --resume, the number of jobs to work on at a time")
 
     def handle(self, *args, **options):
         raw_type = options['raw_type']
         os = options['os']
         if raw_type not in self.RAW_TYPES:
             raise CommandError("Not a valid raw type:" + raw_type)
+        if options['use_cache']:
+            Scraper.use_cache(HttpCache())
+        if options['full_video_info']:
+            VideoRawScraper.use_video_info_keys(None)
+        if options['single_fetch']:
+            VideoRawScraper.use_single_fetch()
+        if options['keep_full_pages']:
+            Scraper.use_full_pages()
         if raw_type == self.RAW_TYPES[0]:
             # scrape youtube raws
             channel_id = options['channel_id']
             lang_code = options['lang_code']
+            channels_tsv = options['channels_tsv']
+            stale_after_days = options['stale_after_days']
+            stale_after = timedelta(days=stale_after_days) if stale_after_days is not None else None
+            if options['resume']:
+                ScrapeYouTubeJobs.resume(os=os,
+                                         num_workers=options['queue_workers'],
+                                         browserless=options['browserless'])
+                return
+            if options['queued']:
+                if channels_tsv:
+                    ScrapeYouTubeJobs.exec_multi(channels_tsv, os=os,
+                                                 num_workers=options['queue_workers'],
+                                                 browserless=options['browserless'])
+                elif channel_id and lang_code:
+                    ScrapeYouTubeJobs.exec(channel_id, lang_code, os=os,
+                                           num_workers=options['queue_workers'],
+                                           browserless=options['browserless'])
+                else:
+                    raise CommandError("for a queued run, either channels_tsv (-f) or"
+                                       " both channel_id (-c) and lang_code (-l) must be given")
+                return
+            if channels_tsv:
+                ScrapeYouTubeRaws.exec_multi(channels_tsv, os=os,
+                                             num_drivers=options['num_drivers'],
+                                             max_pages=options['max_pages'],
+                                             video_workers=options['video_workers'],
+                                             tracks_in_flight=options['tracks_in_flight'],
+                                             incremental=options['incremental'],
+                                             stale_after=stale_after,
+                                             browserless=options['browserless'])
+                return
             if not channel_id or not lang_code:
                 raise CommandError("for scraping a channel, both"
                                    "channel_id (-c) and lang_code (-l) must be given")
-            ScrapeYouTubeRaws.exec(channel_id, lang_code, os=os)
+            ScrapeYouTubeRaws.exec(channel_id, lang_code, os=os,
+                                   video_workers=options['video_workers'],
+                                   tracks_in_flight=options['tracks_in_flight'],
+                                   incremental=options['incremental'],
+                                   stale_after=stale_after,
+                                   browserless=options['browserless'])
         elif raw_type == self.RAW_TYPES[1]:
             # scrape idiom raws
-            ScrapeIdiomRaws.exec()
+            ScrapeIdiomRaws.exec(max_workers=options['idiom_workers'])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from youtora.collect.facades import ScrapeYouTubeJobs
+from youtora.collect.queues import ScrapeQueue
+from youtora.collect.scrapers import Scraper, VideoRawScraper
+
+
+class Command(BaseCommand):
+    HELP = 'work on the scrape job queue. run as many of these as you like, on as many machines as you like.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('os', type=str,
+                            help='either mac or linux')
+        # optional arguments
+        parser.add_argument('--num_workers', type=int, default=ScrapeYouTubeJobs.NUM_WORKERS,
+                            help="the number of jobs to work on at a time, in this process")
+        parser.add_argument('--lease_secs', type=int, default=ScrapeQueue.LEASE_SECS,
+                            help="the jobs of this process are queued again if it stops"
+                                 " renewing their leases for this many seconds")
+        parser.add_argument('--browserless', action='store_true',
+                            help="scrape the channels over http, without chrome")
+        parser.add_argument('--keep_full_pages', action='store_true',
+                            help="for debugging. store the full pages, instead of the payloads the extractors need")
+        parser.add_argument('--single_fetch', action='store_true',
+                            help="fetch each watch page once, and get the video info from it without youtube_dl")
+        parser.add_argument('--forever', action='store_true',
+                            help="keep waiting for new jobs when the queue is empty")
+
+    def handle(self, *args, **options):
+        if options['single_fetch']:
+            VideoRawScraper.use_single_fetch()
+        if options['keep_full_pages']:
+            Scraper.use_full_pages()
+        ScrapeYouTubeJobs.run(options['os'],
+                              num_workers=options['num_workers'],
+                              browserless=options['browserless'],
+                              lease_secs=options['lease_secs'],
+                              forever=options['forever'])
@@ -0,0 +1,39 @@
+# Generated by Django 3.0.5 on 2026-10-18 11:23
+
+from django.db import migrations
+import youtora.collect.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0002_videoraw_scraped_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='channelraw',
+            name='main_html',
+            field=youtora.collect.fields.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='channelraw',
+            name='uploads_html',
+            field=youtora.collect.fields.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='idiomraw',
+            name='main_html',
+            field=youtora.collect.fields.CompressedTextField(blank=True, default=None),
+        ),
+        migrations.AlterField(
+            model_name='tracksraw',
+            name='raw_xml',
+            field=youtora.collect.fields.CompressedTextField(blank=True, default=None),
+        ),
+        migrations.AlterField(
+            model_name='videoraw',
+            name='main_html',
+            field=youtora.collect.fields.CompressedTextField(),
+        ),
+    ]
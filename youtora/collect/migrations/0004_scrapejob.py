@@ -0,0 +1,27 @@
+# Generated by Django 3.0.5 on 2026-10-18 13:40
+
+from django.db import migrations, models
+import djongo.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0003_compressed_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeJob',
+            fields=[
+                ('_id', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=10)),
+                ('payload', djongo.models.fields.JSONField(default=None)),
+                ('status', models.CharField(default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default=None, null=True)),
+                ('owner', models.CharField(blank=True, default=None, max_length=100, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0004_scrapejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collect', '0005_scrapejob_lease_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='priority',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.core.validators import URLValidator
 from djongo import models
 
+from youtora.collect.fields import CompressedTextField
+
 
 # ---  Raw models (YouTube) --- #
 class ChannelRaw(models.Model):
@@ -8,8 +10,8 @@ class ChannelRaw(models.Model):
     _id = models.CharField(primary_key=True, max_length=100)
     url = models.URLField(validators=[URLValidator], blank=False)
     lang_code = models.CharField(max_length=10, blank=False)
-    main_html = models.TextField(blank=False)
-    uploads_html = models.TextField(blank=False)
+    main_html = CompressedTextField(blank=False)
+    uploads_html = CompressedTextField(blank=False)
 
     def __str__(self) -> str:
         return str(self.id)
@@ -30,8 +32,10 @@ class VideoRaw(models.Model):
     # on looking up channel_id, djongo will create a pymongo query for that
     url = models.URLField(validators=[URLValidator], blank=False)
     video_info = models.JSONField(blank=False, default=None)  # should be serialised with json.dumps
-    main_html = models.TextField(blank=False)
+    main_html = CompressedTextField(blank=False)
     channel_id = models.CharField(max_length=100, blank=False)
+    # when this video was scraped. used for deciding whether to re-scrape it or not.
+    scraped_at = models.DateTimeField(blank=True, null=True, default=None)
 
     def __str__(self) -> str:
         return str(self.id)
@@ -52,7 +56,7 @@ class TracksRaw(models.Model):
     # caption id must be unique
     caption_id = models.CharField(max_length=100, blank=False, unique=True)
     # can be null
-    raw_xml = models.TextField(blank=True, default=None)
+    raw_xml = CompressedTextField(blank=True, default=None)
 
     # don't need a relation to video, as we'll look this up by caption id.
 
@@ -77,7 +81,7 @@ class IdiomRaw(models.Model):
     # could be null
     parser_info = models.JSONField(blank=True, default=None)  # get this from wiktionary parser (python)
     # could be null (if request was erroneous)
-    main_html = models.TextField(blank=True, default=None)
+    main_html = CompressedTextField(blank=True, default=None)
 
     def __str__(self) -> str:
         return self.text
@@ -92,3 +96,30 @@ class IdiomRaw(models.Model):
     @property
     def id(self) -> str:
         return self._id
+
+
+# --- scrape jobs --- #
+class ScrapeJob(models.Model):
+    """
+    a persistent work item of a scrape run. the queue is accessed with pymongo, in youtora.collect.queues.
+    """
+    objects = models.Manager()
+    _id = models.CharField(primary_key=True, max_length=200)  # kind|key
+    kind = models.CharField(max_length=10, blank=False)  # channel, video or caption
+    payload = models.JSONField(blank=False, default=None)  # the arguments to scrape the item with
+    status = models.CharField(max_length=10, blank=False, default="pending")
+    attempts = models.IntegerField(default=0)
+    # leased in descending order of priority. see youtora.collect.schedulers
+    priority = models.FloatField(default=0.0)
+    last_error = models.TextField(blank=True, null=True, default=None)
+    owner = models.CharField(max_length=100, blank=True, null=True, default=None)  # the worker leasing this
+    # the lease is renewed by the owner's heartbeats. once expired, the job is queued again.
+    lease_expires_at = models.DateTimeField(blank=True, null=True, default=None)
+    updated_at = models.DateTimeField(blank=True, null=True, default=None)
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+    @property
+    def id(self) -> str:
+        return self._id
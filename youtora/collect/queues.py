@@ -0,0 +1,228 @@
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.utils import timezone
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+
+from youtora.collect.models import ScrapeJob
+from youtora.collect.writers import BulkRawWriter
+
+
+class ScrapeQueue:
+    """
+    a persistent queue of scrape jobs, stored in mongo alongside the raws.
+    a job is a single channel, video or caption to scrape. a worker leases a job, scrapes it,
+    and then marks it as done, or as failed with the error, so that an interrupted run can be resumed
+    from where it stopped.
+    - many workers, on many machines, can lease from the same queue. a lease is claimed atomically,
+    and expires after lease_secs unless the owner renews it with heartbeats.
+    - the jobs leased by a dead worker are queued again once their leases expire.
+    - jobs are leased in descending order of priority, and then in the order they were queued.
+    """
+    KINDS = ("channel", "video", "caption")
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"  # failed MAX_ATTEMPTS times. not leased anymore.
+    MAX_ATTEMPTS = 3
+    LEASE_SECS = 300
+    _collection = None
+
+    @classmethod
+    def enqueue(cls, kind: str, key: str, payload: dict, reset: bool = False, priority: float = 0.0):
+        """
+        :param reset: if True, a job that already exists is reset to pending, even if it is done.
+        otherwise, the existing job is left as it is.
+        """
+        cls.enqueue_many(kind, [(key, payload)], reset, priority)
+
+    @classmethod
+    def enqueue_many(cls, kind: str, items: Iterable[Tuple[str, dict]], reset: bool = False,
+                     priority: float = 0.0) -> int:
+        """
+        :param items: (key, payload) pairs. the job id is kind|key.
+        :param priority: the priority of the jobs. the higher, the sooner they are leased.
+        :return: the number of jobs newly queued (or reset).
+        """
+        assert kind in cls.KINDS
+        now = timezone.now()
+        requests = list()
+        for key, payload in items:
+            job = {'kind': kind, 'payload': payload, 'status': cls.PENDING, 'attempts': 0, 'priority': priority,
+                   'last_error': None, 'owner': None, 'lease_expires_at': None, 'updated_at': now}
+            update = {'$set': job} if reset else {'$setOnInsert': job}
+            requests.append(UpdateOne({'_id': cls.get_job_id(kind, key)}, update, upsert=True))
+        if not requests:
+            return 0
+        result = cls.get_collection().bulk_write(requests, ordered=False)
+        return result.upserted_count + (result.modified_count if reset else 0)
+
+    @classmethod
+    def lease(cls, owner: str, lease_secs: int = LEASE_SECS) -> Optional[dict]:
+        """
+        atomically claim the pending job of the highest priority.
+        :param owner: the name of the worker leasing the job. must be unique across workers.
+        :param lease_secs: the lease expires after this many seconds, unless renewed with heartbeat().
+        :return: the leased job, or None if there is no pending job.
+        """
+        now = timezone.now()
+        return cls.get_collection().find_one_and_update(
+            {'status': cls.PENDING},
+            {'$set': {'status': cls.LEASED, 'owner': owner, 'updated_at': now,
+                      'lease_expires_at': now + timedelta(seconds=lease_secs)},
+             '$inc': {'attempts': 1}},
+            sort=[('priority', DESCENDING), ('updated_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @classmethod
+    def heartbeat(cls, job: dict, lease_secs: int = LEASE_SECS) -> bool:
+        """
+        renew the lease of a job.
+        :return: False if the lease has been lost, i.e. it expired and the job was queued again.
+        """
+        result = cls.get_collection().update_one(
+            cls._held_by_owner(job),
+            {'$set': {'lease_expires_at': timezone.now() + timedelta(seconds=lease_secs)}}
+        )
+        return result.matched_count > 0
+
+    @classmethod
+    def complete(cls, job: dict):
+        cls.get_collection().update_one(
+            cls._held_by_owner(job),
+            {'$set': {'status': cls.DONE, 'last_error': None, 'lease_expires_at': None,
+                      'updated_at': timezone.now()}}
+        )
+
+    @classmethod
+    def fail(cls, job: dict, error: str):
+        """
+        record the error. the job is queued again, unless it has failed MAX_ATTEMPTS times.
+        """
+        logger = logging.getLogger("fail")
+        status = cls.FAILED if job['attempts'] >= cls.MAX_ATTEMPTS else cls.PENDING
+        logger.warning("{}:{}:(attempts={}):{}".format(status, job['_id'], job['attempts'], error))
+        cls.get_collection().update_one(
+            cls._held_by_owner(job),
+            {'$set': {'status': status, 'last_error': error, 'owner': None, 'lease_expires_at': None,
+                      'updated_at': timezone.now()}}
+        )
+
+    @classmethod
+    def iter_pending(cls, projection: Optional[dict] = None) -> Iterable[dict]:
+        return cls.get_collection().find({'status': cls.PENDING}, projection=projection)
+
+    @classmethod
+    def set_priorities(cls, priorities: Dict[str, float]):
+        """
+        :param priorities: job id -> priority. only the jobs still pending are updated.
+        """
+        if not priorities:
+            return
+        cls.get_collection().bulk_write([
+            UpdateOne({'_id': job_id, 'status': cls.PENDING}, {'$set': {'priority': priority}})
+            for job_id, priority in priorities.items()
+        ], ordered=False)
+
+    @classmethod
+    def requeue_expired(cls) -> int:
+        """
+        put the jobs whose leases have expired back to pending, or to failed if they have run out of attempts.
+        :return: the number of jobs requeued
+        """
+        logger = logging.getLogger("requeue_expired")
+        now = timezone.now()
+        expired = {'status': cls.LEASED, 'lease_expires_at': {'$lt': now}}
+        update = {'last_error': "lease expired", 'owner': None, 'lease_expires_at': None, 'updated_at': now}
+        failed = cls.get_collection().update_many(
+            dict(expired, attempts={'$gte': cls.MAX_ATTEMPTS}),
+            {'$set': dict(update, status=cls.FAILED)}
+        ).modified_count
+        requeued = cls.get_collection().update_many(
+            expired,
+            {'$set': dict(update, status=cls.PENDING)}
+        ).modified_count
+        if failed or requeued:
+            logger.warning("lease expired:(requeued={}, failed={})".format(requeued, failed))
+        return requeued
+
+    @classmethod
+    def has_leased(cls) -> bool:
+        return cls.get_collection().count_documents({'status': cls.LEASED}, limit=1) > 0
+
+    @classmethod
+    def get_counts(cls) -> Dict[str, int]:
+        """
+        :return: the number of jobs per status
+        """
+        return {
+            group['_id']: group['count']
+            for group in cls.get_collection().aggregate([{'$group': {'_id': "$status", 'count': {'$sum': 1}}}])
+        }
+
+    @classmethod
+    def _held_by_owner(cls, job: dict) -> dict:
+        """
+        matches the job only while it is still leased by the worker, so that a worker
+        that has lost its lease does not overwrite the work of the next one.
+        """
+        return {'_id': job['_id'], 'owner': job['owner'], 'status': cls.LEASED}
+
+    @classmethod
+    def get_job_id(cls, kind: str, key: str) -> str:
+        return "|".join([kind, key])
+
+    @classmethod
+    def get_collection(cls) -> Collection:
+        if cls._collection is None:
+            collection = BulkRawWriter.get_collection(ScrapeJob)
+            # for leasing the pending job of the highest priority
+            collection.create_index([('status', ASCENDING), ('priority', DESCENDING), ('updated_at', ASCENDING)])
+            # for finding the expired leases
+            collection.create_index([('status', ASCENDING), ('lease_expires_at', ASCENDING)])
+            cls._collection = collection
+        return cls._collection
+
+
+class LeaseHeartbeat:
+    """
+    renews, from a background thread, the leases of the jobs the workers of this process are holding.
+    """
+
+    def __init__(self, lease_secs: int = ScrapeQueue.LEASE_SECS):
+        self.lease_secs = lease_secs
+        # renew well before the leases expire
+        self.interval = lease_secs / 3
+        self._held: Dict[str, dict] = dict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=self.__class__.__name__, daemon=True)
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+
+    def hold(self, job: dict):
+        with self._lock:
+            self._held[job['_id']] = job
+
+    def release(self, job: dict):
+        with self._lock:
+            self._held.pop(job['_id'], None)
+
+    def _beat(self):
+        logger = logging.getLogger("_beat")
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                jobs = list(self._held.values())
+            for job in jobs:
+                if not ScrapeQueue.heartbeat(job, self.lease_secs):
+                    logger.warning("lease lost:{}:{}".format(job['_id'], job['owner']))
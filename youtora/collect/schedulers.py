@@ -0,0 +1,176 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+from lxml import etree
+
+from youtora.collect.models import ChannelRaw, VideoRaw
+from youtora.collect.queues import ScrapeQueue
+from youtora.collect.scrapers import ChannelRawScraper
+from youtora.collect.writers import BulkRawWriter
+from youtora.refine.errors import ChannelInfoNotFoundError
+from youtora.refine.extractors import ChannelExtractor
+
+
+@dataclass
+class Signals:
+    """
+    what is known about a job before it is scraped. None if unknown.
+    """
+    subs: Optional[int] = None
+    views: Optional[int] = None
+    publish_date: Optional[date] = None
+    scraped_at: Optional[datetime] = None
+
+
+class ScrapeScheduler:
+    """
+    ranks the pending scrape jobs, so that the ones most likely to produce search hits are scraped first.
+    the score of a job is the weighted sum of its signals, each of which is scaled to roughly [0, 1]:
+    - subs: the subscriber count of the channel, log-scaled.
+    - views: the view count of the video, log-scaled.
+    - recency: how recently the video was published. halves every RECENCY_HALF_LIFE_DAYS.
+    - staleness: how long ago the raw was scraped. 1 if it was never scraped, or scraped STALE_AFTER_DAYS ago.
+    workers lease the jobs in descending order of the score.
+    """
+    WEIGHTS = {
+        'subs': 1.0,
+        'views': 1.0,
+        'recency': 1.0,
+        'staleness': 0.5
+    }
+    # log10 of a billion. counts are scaled by this
+    LOG_SCALE = 9
+    RECENCY_HALF_LIFE_DAYS = 365
+    STALE_AFTER_DAYS = 30
+    # the number of pending jobs to look up the signals of at a time
+    BATCH_SIZE = 1000
+    # the http requests it takes to scrape a job of each kind, for estimating the cost of a plan
+    REQUESTS_PER_JOB = {
+        'channel': ChannelRawScraper.PAGES_PER_CHANNEL,
+        'video': 2,  # video info & main html. 1 with the single fetch mode.
+        'caption': 1
+    }
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        :param weights: the weights to override WEIGHTS with.
+        """
+        self.weights = dict(self.WEIGHTS, **(weights or dict()))
+
+    def score(self, signals: Signals) -> float:
+        now = timezone.now()
+        scaled = {
+            'subs': self._log_scale(signals.subs),
+            'views': self._log_scale(signals.views),
+            'recency': 0.5 ** ((now.date() - signals.publish_date).days / self.RECENCY_HALF_LIFE_DAYS)
+            if signals.publish_date else 0.0,
+            'staleness': min(1.0, (now - signals.scraped_at).days / self.STALE_AFTER_DAYS)
+            if signals.scraped_at else 1.0
+        }
+        return sum(self.weights[name] * value for name, value in scaled.items())
+
+    def prioritise(self, dry_run: bool = False) -> Iterable[Tuple[dict, float]]:
+        """
+        score all the pending jobs, and store their priorities unless dry_run.
+        :return: a generator of (job, score), in the order of the queue.
+        """
+        logger = logging.getLogger("prioritise")
+        batch = list()
+        scored_cnt = 0
+        for job in ScrapeQueue.iter_pending(projection={'kind': True, 'payload': True}):
+            batch.append(job)
+            if len(batch) >= self.BATCH_SIZE:
+                yield from self._prioritise_batch(batch, dry_run)
+                scored_cnt += len(batch)
+                batch = list()
+                logger.info("scored:{} jobs".format(scored_cnt))
+        if batch:
+            yield from self._prioritise_batch(batch, dry_run)
+
+    def estimate_requests(self, job: dict) -> int:
+        return self.REQUESTS_PER_JOB[job['kind']]
+
+    def _prioritise_batch(self, jobs: List[dict], dry_run: bool) -> List[Tuple[dict, float]]:
+        signals = self.get_signals(jobs)
+        scored = [
+            (job, self.score(signals[job['_id']]))
+            for job in jobs
+        ]
+        if not dry_run:
+            ScrapeQueue.set_priorities({job['_id']: score for job, score in scored})
+        return scored
+
+    def get_signals(self, jobs: List[dict]) -> Dict[str, Signals]:
+        """
+        look up the signals of the jobs from the raws already stored, with one query per collection.
+        :return: job id -> signals
+        """
+        vid_ids = set()
+        chan_ids = set()
+        for job in jobs:
+            payload = job['payload']
+            if job['kind'] == "channel":
+                chan_ids.add(payload['channel_id'])
+            elif job['kind'] == "video":
+                vid_ids.add(payload['vid_id'])
+                chan_ids.add(payload['channel_id'])
+            elif job['kind'] == "caption":
+                vid_ids.add(payload['video_id'])
+        videos = {
+            doc['_id']: doc
+            for doc in BulkRawWriter.get_collection(VideoRaw).find(
+                {'_id': {'$in': list(vid_ids)}},
+                projection={'channel_id': True, 'scraped_at': True,
+                            'video_info.view_count': True, 'video_info.upload_date': True}
+            )
+        }
+        chan_ids.update(video['channel_id'] for video in videos.values())
+        subs = self._get_subs(chan_ids)
+        signals = dict()
+        for job in jobs:
+            payload = job['payload']
+            if job['kind'] == "channel":
+                # channels are scraped again to find new uploads, so they are never stale
+                signals[job['_id']] = Signals(subs=subs.get(payload['channel_id']), scraped_at=timezone.now())
+                continue
+            vid_id = payload['vid_id'] if job['kind'] == "video" else payload['video_id']
+            video = videos.get(vid_id)
+            if video is None:
+                signals[job['_id']] = Signals(subs=subs.get(payload.get('channel_id')))
+                continue
+            video_info = video.get('video_info') or dict()
+            upload_date = video_info.get('upload_date')
+            scraped_at = video.get('scraped_at')
+            if scraped_at and timezone.is_naive(scraped_at):
+                # pymongo reads datetimes as naive utc
+                scraped_at = timezone.make_aware(scraped_at, timezone.utc)
+            signals[job['_id']] = Signals(
+                subs=subs.get(video['channel_id']),
+                views=video_info.get('view_count'),
+                publish_date=datetime.strptime(upload_date, "%Y%m%d").date() if upload_date else None,
+                # a caption of a stored video is yet to be scraped
+                scraped_at=scraped_at if job['kind'] == "video" else None
+            )
+        return signals
+
+    @classmethod
+    def _get_subs(cls, chan_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        :return: channel id -> subs. the channels whose subs cannot be parsed are left out, i.e. their subs are None.
+        """
+        logger = logging.getLogger("_get_subs")
+        subs = dict()
+        for channel_raw in ChannelRaw.objects.filter(_id__in=list(chan_ids)).only('_id', 'main_html'):
+            try:
+                subs[channel_raw.id] = ChannelExtractor._ext_subs(channel_raw.main_html, channel_raw.id)
+            except (ChannelInfoNotFoundError, ValueError, etree.ParserError) as e:
+                logger.warning("SKIP:subs:{}".format(e))
+        return subs
+
+    @classmethod
+    def _log_scale(cls, count: Optional[int]) -> float:
+        return math.log10(1 + count) / cls.LOG_SCALE if count else 0.0
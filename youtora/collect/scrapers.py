@@ -1,22 +1,41 @@
 # for type hinting
+import csv
+import html
+import json
 import logging
+import random
+import re
+import threading
+import time
 from abc import ABC
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from os import path
-from typing import List, Generator, Optional
+from types import SimpleNamespace
+from typing import List, Generator, Optional, Iterable, Callable, Tuple, Dict, Set
+from urllib.parse import urlparse
 
-import pandas as pd  # for reading in the list of idioms
 import requests
+import requests.adapters
 import youtube_dl
+from django.utils import timezone
 from selenium import webdriver
 # for checking when to stop loading uploads
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as e_c
 from selenium.webdriver.support.ui import WebDriverWait
 from wiktionaryparser import WiktionaryParser
 
 from config.settings import DATA_DIR, STR_FORMATS
+from youtora.collect.caches import HttpCache
+from youtora.collect.limiters import HostRateLimiter
 from youtora.refine.dataclasses import Caption
+from youtora.refine.errors import ChannelInfoNotFoundError
+from youtora.refine.extractors import ChannelExtractor, CaptionExtractor
 from .models import TracksRaw, ChannelRaw, VideoRaw, IdiomRaw
 
 
@@ -28,6 +47,34 @@ class Scraper(ABC):
     }
     # I'm using this for now..
     MOBILE_OPT: dict = {"deviceName": "Nexus 5"}
+    # the default headers to send with every http request. override this in the sub classes.
+    HEADERS: dict = dict()
+    # the number of per-host connection pools to keep
+    POOL_CONNECTIONS = 10
+    # the maximum number of keep-alive connections to keep in each pool
+    POOL_MAXSIZE = 16
+    # (connect, read) timeouts for http requests, in seconds
+    HTTP_TIME_OUT = (10, 30)
+    # one pooled http session per scraper class, shared across threads
+    _sessions: Dict[type, requests.Session] = dict()
+    _sessions_lock = threading.Lock()
+    # how long the responses of this scraper stay fresh in the http cache, in seconds.
+    # None means the responses of this scraper are never cached.
+    CACHE_TTL: Optional[float] = None
+    # the on-disk http cache shared by all scrapers. disabled until use_cache() is called
+    _http_cache: Optional[HttpCache] = None
+    # --- retries --- #
+    # 429 is for rate limiting, 5xx's are for server-side errors that are likely to go away
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    THROTTLE_STATUSES = (429, 503)
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 1.0  # seconds
+    BACKOFF_MAX = 60.0  # seconds
+    # the adaptive rate limiter shared by all scrapers
+    _rate_limiter = HostRateLimiter()
+    # --- for debugging the extractors --- #
+    # store the full pages, instead of the minimal payloads the extractors need. off until use_full_pages()
+    _keep_full_pages = False
 
     @classmethod
     def scrape(cls, **kwargs):
@@ -83,8 +130,283 @@ class Scraper(ABC):
         # the driver to use
         return driver
 
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """
+        get the pooled http session of this scraper class. the session is created on the first call,
+        and reused afterwards, so that keep-alive connections are reused across requests.
+        :return: a session with per-host connection pools, with cls.HEADERS as its default headers.
+        """
+        with cls._sessions_lock:
+            session = cls._sessions.get(cls, None)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=cls.POOL_CONNECTIONS,
+                                                        pool_maxsize=cls.POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(cls.HEADERS)
+                cls._sessions[cls] = session
+            return session
+
+    @classmethod
+    def close_sessions(cls):
+        """
+        close all the pooled http sessions. they will be re-created on the next get_session() call.
+        """
+        with cls._sessions_lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions.clear()
+
+    @classmethod
+    def use_cache(cls, http_cache: Optional[HttpCache]):
+        """
+        put an on-disk http cache beneath all scrapers. pass None to disable it.
+        """
+        Scraper._http_cache = http_cache
+
+    @classmethod
+    def use_full_pages(cls, keep_full_pages: bool = True):
+        """
+        store the full pages scraped, for debugging the extractors.
+        """
+        Scraper._keep_full_pages = keep_full_pages
+
+    @classmethod
+    def http_get(cls, url: str, **kwargs) -> requests.Response:
+        """
+        send a get request with the pooled session of this scraper class.
+        if the http cache is in use, fresh cached responses are returned without a request,
+        and stale ones are revalidated with ETag / Last-Modified, where the server supports it.
+        """
+        kwargs.setdefault('timeout', cls.HTTP_TIME_OUT)
+        http_cache = Scraper._http_cache
+        if http_cache is None or cls.CACHE_TTL is None:
+            return cls._send(url, **kwargs)
+        # the headers that make a difference in the response are part of the key
+        key_headers = dict(cls.HEADERS, **kwargs.get('headers', dict()))
+        cached = http_cache.get(url, key_headers)
+        if cached and cached.age < cls.CACHE_TTL:
+            return cached.to_response()
+        headers = dict(kwargs.pop('headers', dict()))
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        response = cls._send(url, headers=headers, **kwargs)
+        if cached and response.status_code == 304:
+            # not modified
+            return http_cache.refresh(url, key_headers, cached).to_response()
+        if response.status_code == 200:
+            http_cache.put(url, key_headers, response)
+        return response
+
+    @classmethod
+    def extract_info(cls, ydl: youtube_dl.YoutubeDL, url: str) -> dict:
+        """
+        extract info with youtube_dl, at the pace the host allows.
+        youtube_dl retries by itself, so this only slows down the host when it throttles us.
+        """
+        host = urlparse(url).netloc
+        cls._rate_limiter.acquire(host)
+        try:
+            info: dict = ydl.extract_info(url=url, download=False)
+        except youtube_dl.utils.DownloadError as de:
+            if "HTTP Error 429" in str(de):
+                cls._rate_limiter.on_throttle(host)
+            raise de
+        else:
+            cls._rate_limiter.on_success(host)
+            return info
+
+    @classmethod
+    def _send(cls, url: str, **kwargs) -> requests.Response:
+        """
+        send a get request, at the pace the host allows, retrying on connection errors & retryable statuses
+        with jittered exponential backoff. the response of the last attempt is returned as is.
+        """
+        logger = logging.getLogger("_send")
+        host = urlparse(url).netloc
+        for attempt in range(cls.MAX_RETRIES + 1):
+            cls._rate_limiter.acquire(host)
+            is_last = attempt == cls.MAX_RETRIES
+            try:
+                response = cls.get_session().get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if is_last:
+                    raise e
+                logger.warning("RETRY:#{}:{}:{}".format(attempt + 1, url, str(e)))
+                time.sleep(cls._backoff(attempt))
+                continue
+            if response.status_code not in cls.RETRY_STATUSES:
+                cls._rate_limiter.on_success(host)
+                return response
+            retry_after = cls._parse_retry_after(response.headers.get('Retry-After', None))
+            if response.status_code in cls.THROTTLE_STATUSES:
+                cls._rate_limiter.on_throttle(host, retry_after)
+            if is_last:
+                return response
+            logger.warning("RETRY:#{}:{}:{}".format(attempt + 1, url, response.status_code))
+            time.sleep(max(retry_after or 0, cls._backoff(attempt)))
+
+    @classmethod
+    def _backoff(cls, attempt: int) -> float:
+        """
+        exponential backoff with full jitter.
+        https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        """
+        return random.uniform(0, min(cls.BACKOFF_MAX, cls.BACKOFF_BASE * (2 ** attempt)))
+
+    @classmethod
+    def _parse_retry_after(cls, retry_after: Optional[str]) -> Optional[float]:
+        """
+        e.g. Retry-After: 120
+        e.g. Retry-After: Wed, 21 Oct 2015 07:28:00 GMT
+        :return: the seconds to wait
+        """
+        if not retry_after:
+            return None
+        if retry_after.strip().isdigit():
+            return float(retry_after)
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+    @classmethod
+    def _scrape_bounded(cls, scrape_func: Callable, args_iter: Iterable[tuple],
+                        max_in_flight: int) -> Generator[Tuple[tuple, Future], None, None]:
+        """
+        call scrape_func on a bounded thread pool, and yield (args, future) pairs as they finish.
+        args_iter is consumed lazily; no more than max_in_flight calls are running (or queued) at a time.
+        exceptions are not raised here. they are raised when the caller calls future.result().
+        :param scrape_func: the function to call with each args tuple
+        :param args_iter: an iterable of argument tuples
+        :param max_in_flight: the maximum number of calls in flight
+        :return: a generator of (args, future) pairs, in the order of completion
+        """
+        in_flight = dict()  # future -> args
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=cls.__name__) as executor:
+            for args in args_iter:
+                if len(in_flight) >= max_in_flight:
+                    # wait for a slot to free up
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield in_flight.pop(future), future
+                in_flight[executor.submit(scrape_func, *args)] = args
+            # drain the remaining ones
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future
+
+
+class DriverPool:
+    """
+    a pool of warm chrome drivers, to be shared across threads.
+    a driver is leased to one thread at a time, and is recycled after it has loaded max_pages pages,
+    to keep the memory of the browser bounded.
+    """
+    MAX_PAGES = 20
+
+    def __init__(self, size: int, os: str, max_pages: int = MAX_PAGES,
+                 is_silent: bool = True, is_mobile: bool = True):
+        self.size = size
+        self.os = os
+        self.max_pages = max_pages
+        self.is_silent = is_silent
+        self.is_mobile = is_mobile
+        self._idle: List[webdriver.Chrome] = list()  # a stack. reuse the warmest driver first
+        self._page_cnts: Dict[webdriver.Chrome, int] = dict()  # alive driver -> the pages it has loaded
+        self._num_alive = 0  # including the ones being started
+        self._cond = threading.Condition()
+
+    def __enter__(self) -> 'DriverPool':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @contextmanager
+    def lease(self, pages: int = 1) -> Generator[webdriver.Chrome, None, None]:
+        """
+        lease a driver. blocks until one is available.
+        :param pages: the number of pages the leaser loads with the driver.
+        """
+        driver = self._acquire()
+        is_broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            is_broken = True
+            raise
+        finally:
+            if is_broken:
+                # a broken driver should not go back to the pool
+                self._discard(driver)
+            else:
+                self._release(driver, pages)
+
+    def close(self):
+        """
+        quit all the idle drivers.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, list()
+        for driver in idle:
+            self._discard(driver)
+
+    def _acquire(self) -> webdriver.Chrome:
+        with self._cond:
+            while not self._idle and self._num_alive >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            # reserve a slot for a new driver, and start it outside the lock
+            self._num_alive += 1
+        try:
+            driver = Scraper.get_driver(self.is_silent, self.is_mobile, self.os)
+        except Exception:
+            with self._cond:
+                self._num_alive -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._page_cnts[driver] = 0
+        return driver
+
+    def _release(self, driver: webdriver.Chrome, pages: int):
+        logger = logging.getLogger("_release")
+        with self._cond:
+            self._page_cnts[driver] += pages
+            is_worn_out = self._page_cnts[driver] >= self.max_pages
+            if not is_worn_out:
+                self._idle.append(driver)
+                self._cond.notify()
+        if is_worn_out:
+            logger.info("recycling the driver...")
+            self._discard(driver)
+
+    def _discard(self, driver: webdriver.Chrome):
+        logger = logging.getLogger("_discard")
+        with self._cond:
+            if self._page_cnts.pop(driver, None) is not None:
+                self._num_alive -= 1
+                self._cond.notify()
+        try:
+            driver.quit()
+        except WebDriverException as wde:
+            logger.warning(str(wde))
+
 
 class TracksRawScraper(Scraper):
+    # the maximum number of caption downloads in flight at a time
+    MAX_IN_FLIGHT = 8
+    # captions rarely change once uploaded
+    CACHE_TTL = 30 * 24 * 60 * 60
+
     @classmethod
     def scrape(cls, caption: Caption) -> TracksRaw:
         """
@@ -99,18 +421,32 @@ class TracksRawScraper(Scraper):
         return tracks_raw
 
     @classmethod
-    def scrape_multi(cls, caption_list: List[Caption]) -> Generator[TracksRaw, None, None]:
-        # returns a generator
+    def scrape_multi(cls, captions: Iterable[Caption],
+                     max_in_flight: int = MAX_IN_FLIGHT) -> Generator[TracksRaw, None, None]:
+        """
+        downloads the raw xml of the captions concurrently, with at most max_in_flight downloads at a time.
+        captions can be a lazy iterable spanning many videos; it is consumed as slots free up.
+        :param captions: the captions to download tracks for
+        :param max_in_flight: set this to 1 to download the captions one by one.
+        :return: a generator of tracks_raw objects, in the order of completion.
+        """
+        if max_in_flight <= 1:
+            # sequential mode
+            return (
+                cls.scrape(caption)
+                for caption in captions
+            )
+        args_iter = ((caption,) for caption in captions)
         return (
-            cls.scrape(caption)
-            for caption in caption_list
+            future.result()
+            for _, future in cls._scrape_bounded(cls.scrape, args_iter, max_in_flight)
         )
 
     @classmethod
     def _scrape_raw_xml(cls, caption_url: str) -> Optional[str]:
         logger = logging.getLogger("_scrape_raw_xml")
         logger.info("loading raw xml...:" + caption_url)
-        response = requests.get(caption_url)  # first, get the response (download)
+        response = cls.http_get(caption_url)  # first, get the response (download)
         try:
             response.raise_for_status()  # check if the response was erroneous
         except requests.exceptions.HTTPError as he:
@@ -120,7 +456,7 @@ class TracksRawScraper(Scraper):
             return response.text
 
 
-class VideoRawScraper:
+class VideoRawScraper(Scraper):
     VIDEO_DL_OPTS = {
         'writesubtitles': True,
         'allsubtitles': True,
@@ -135,6 +471,62 @@ class VideoRawScraper:
         # get the english page
         "Accept-Language": "en"
     }
+    # the maximum number of videos to scrape at a time
+    MAX_WORKERS = 4
+    # view counts change daily
+    CACHE_TTL = 24 * 60 * 60
+    # one YoutubeDL instance per worker thread
+    _ydl_local = threading.local()
+    # --- for keeping only what the refine stage reads from the video info --- #
+    # the keys read by VideoExtractor & CaptionExtractor, and a few more that are cheap to keep
+    VIDEO_INFO_KEYS = ('id', 'title', 'channel_id', 'duration', 'upload_date', 'view_count', 'categories',
+                       'automatic_captions', 'subtitles')
+    CAPTION_INFO_KEYS = ('automatic_captions', 'subtitles')
+    # None keeps the full video info
+    _video_info_keys: Optional[Tuple[str, ...]] = VIDEO_INFO_KEYS
+    # --- for scraping with a single fetch of the watch page --- #
+    # disabled until use_single_fetch() is called
+    _single_fetch = False
+    PLAYER_RESPONSE_RE = re.compile(r'ytInitialPlayerResponse\s*=\s*\{')
+    # the caption formats, in the order youtube_dl lists them
+    SUBTITLE_FORMATS = ('srv1', 'srv2', 'srv3', 'ttml', 'vtt')
+
+    @classmethod
+    def use_video_info_keys(cls, video_info_keys: Optional[Iterable[str]]):
+        """
+        set the keys of the video info to keep. pass None to keep the full youtube_dl dump.
+        """
+        cls._video_info_keys = tuple(video_info_keys) if video_info_keys is not None else None
+
+    @classmethod
+    def project_video_info(cls, video_info: dict) -> dict:
+        """
+        keep only the keys of the video info the refine stage reads. out of the caption infos,
+        only the languages to collect and the formats up to the one CaptionExtractor uses are kept.
+        """
+        if cls._video_info_keys is None:
+            return video_info
+        projected = {
+            key: video_info[key]
+            for key in cls._video_info_keys
+            if key in video_info
+        }
+        lang_codes = {lang_code for lang_code, _ in CaptionExtractor.LANG_CODES_TO_COLLECT}
+        for key in cls.CAPTION_INFO_KEYS:
+            if projected.get(key):
+                projected[key] = {
+                    lang_code: formats[:CaptionExtractor.FORMAT_IDX + 1]
+                    for lang_code, formats in projected[key].items()
+                    if lang_code in lang_codes
+                }
+        return projected
+
+    @classmethod
+    def use_single_fetch(cls, single_fetch: bool = True):
+        """
+        get the video info from the watch page, instead of having youtube_dl fetch the same page again.
+        """
+        cls._single_fetch = single_fetch
 
     @classmethod
     def scrape(cls, vid_id: str, channel_id: str) -> VideoRaw:
@@ -143,29 +535,49 @@ class VideoRawScraper:
         """
         vid_url = cls.VID_URL_FORMAT.format(vid_id)
         # get video info and main html
-        video_info = cls._scrape_video_info(vid_url)
-        main_html = cls._scrape_main_html(vid_url)
+        if cls._single_fetch:
+            main_html = cls._scrape_main_html(vid_url)
+            video_info = cls._ext_video_info(vid_id, main_html)
+        else:
+            video_info = cls._scrape_video_info(vid_url)
+            main_html = cls._scrape_main_html(vid_url)
+        if not Scraper._keep_full_pages:
+            main_html = cls._ext_player_response_html(vid_id, main_html)
+        video_info = cls.project_video_info(video_info)
         # assign and return. make sure to save them later.
         video_raw = VideoRaw(_id=vid_id, url=vid_url, channel_id=channel_id,
-                             main_html=main_html, video_info=video_info)
+                             main_html=main_html, video_info=video_info,
+                             scraped_at=timezone.now())
         return video_raw
 
     @classmethod
-    def scrape_multi(cls, vid_id_list: List[str], channel_id: str) -> Generator[VideoRaw, None, None]:
+    def scrape_views(cls, vid_id: str) -> Optional[int]:
         """
-        returns a generator.
+        scrape just the view count of a video, with a single fetch of the watch page.
+        """
+        main_html = cls._scrape_main_html(cls.VID_URL_FORMAT.format(vid_id))
+        return cls._ext_video_info(vid_id, main_html)['view_count']
+
+    @classmethod
+    def scrape_multi(cls, vid_id_list: List[str], channel_id: str,
+                     max_workers: int = MAX_WORKERS) -> Generator[VideoRaw, None, None]:
+        """
+        scrapes the videos on a pool of max_workers workers.
         :param vid_id_list:
         :param channel_id:
-        :return: a generator of video_raw objects
+        :param max_workers: the maximum number of videos to scrape at a time. 1 scrapes them one by one.
+        :return: a generator of video_raw objects, in the order of completion
         """
         logger = logging.getLogger("scrape_multi")
         total = len(vid_id_list)
         done = 0
         skipped = 0
-        for vid_id in vid_id_list:
+        latencies = defaultdict(list)  # worker name -> the latencies of the videos it scraped
+        args_iter = ((vid_id, channel_id, latencies) for vid_id in vid_id_list)
+        for _, future in cls._scrape_bounded(cls._scrape_timed, args_iter, max_workers):
             try:
                 # try scraping video for this
-                video_raw = cls.scrape(vid_id, channel_id)
+                video_raw = future.result()
             except youtube_dl.utils.DownloadError as de:
                 # if downloading the video fails, log and just skip this one
                 logger.warning(de)
@@ -179,23 +591,158 @@ class VideoRawScraper:
                             .format(done, skipped, total))
         else:
             assert total == done + skipped
+            cls._log_latencies(latencies)
+
+    @classmethod
+    def _scrape_timed(cls, vid_id: str, channel_id: str, latencies: Dict[str, List[float]]) -> VideoRaw:
+        """
+        scrape a video, and record how long it took under the name of the current worker.
+        """
+        start = time.perf_counter()
+        try:
+            return cls.scrape(vid_id, channel_id)
+        finally:
+            latencies[threading.current_thread().name].append(time.perf_counter() - start)
+
+    @classmethod
+    def _log_latencies(cls, latencies: Dict[str, List[float]]):
+        """
+        log the per-worker latency stats, for tuning max_workers.
+        """
+        logger = logging.getLogger("_log_latencies")
+        for worker_name, worker_latencies in sorted(latencies.items()):
+            logger.info("latency:worker={}:(cnt={}, mean={:.2f}s, max={:.2f}s, total={:.2f}s)"
+                        .format(worker_name, len(worker_latencies),
+                                sum(worker_latencies) / len(worker_latencies),
+                                max(worker_latencies), sum(worker_latencies)))
 
     @classmethod
     def _scrape_video_info(cls, vid_url: str) -> dict:
         logger = logging.getLogger("_scrape_video_info")
-        with youtube_dl.YoutubeDL(cls.VIDEO_DL_OPTS) as ydl:
-            logger.info("loading video_info...")
-            video_info: dict = ydl.extract_info(url=vid_url, download=False)
+        ydl = cls.get_ydl()
+        logger.info("loading video_info...")
+        video_info: dict = cls.extract_info(ydl, vid_url)
         return video_info
 
+    @classmethod
+    def get_ydl(cls) -> youtube_dl.YoutubeDL:
+        """
+        get the YoutubeDL instance of the current worker thread. it is created on the first call,
+        and reused afterwards so that the extractors and their caches are initialised only once per worker.
+        the instance goes away with the worker, i.e. at the end of the scrape_multi run.
+        """
+        ydl = getattr(cls._ydl_local, 'ydl', None)
+        if ydl is None:
+            ydl = youtube_dl.YoutubeDL(cls.VIDEO_DL_OPTS)
+            cls._ydl_local.ydl = ydl
+        return ydl
+
     @classmethod
     def _scrape_main_html(cls, vid_url: str) -> str:
         logger = logging.getLogger("_scrape_main_html")
         logger.info("loading main_html...")
-        response = requests.get(url=vid_url, headers=cls.HEADERS)
+        response = cls.http_get(vid_url)
         response.raise_for_status()
         return response.text
 
+    @classmethod
+    def _ext_video_info(cls, vid_id: str, main_html: str) -> dict:
+        """
+        extract, from ytInitialPlayerResponse in the watch page, the video info that youtube_dl would have
+        extracted from the same page, as far as VideoExtractor & CaptionExtractor are concerned.
+        :raises youtube_dl.utils.DownloadError: if the video is not playable, or the page lacks any of the info
+        VideoExtractor reads, so that it is skipped as before.
+        """
+        match = cls.PLAYER_RESPONSE_RE.search(main_html)
+        if not match:
+            raise youtube_dl.utils.DownloadError("ytInitialPlayerResponse not found:" + vid_id)
+        # decode just the object, as the script may go on after it
+        try:
+            player_response, _ = json.JSONDecoder().raw_decode(main_html, match.end() - 1)
+        except json.JSONDecodeError as jde:
+            # e.g. a truncated page
+            raise youtube_dl.utils.DownloadError("ytInitialPlayerResponse not parsable:{}:{}".format(vid_id, jde))
+        playability = player_response.get('playabilityStatus', dict())
+        if playability.get('status') != "OK" or 'videoDetails' not in player_response:
+            raise youtube_dl.utils.DownloadError("not playable:{}:{}".format(vid_id, playability.get('reason')))
+        details = player_response['videoDetails']
+        microformat = player_response.get('microformat', dict()).get('playerMicroformatRenderer', dict())
+        upload_date = microformat.get('uploadDate') or microformat.get('publishDate')
+        category = microformat.get('category')
+        missing = [
+            key
+            for key, value in (('upload_date', upload_date), ('categories', category),
+                               ('view_count', details.get('viewCount')))
+            if not value
+        ]
+        if missing:
+            # e.g. the microformat is not there. VideoExtractor would fail on every refine
+            raise youtube_dl.utils.DownloadError("missing:{}:{}".format(vid_id, ",".join(missing)))
+        automatic_captions, subtitles = cls._ext_caption_infos(player_response)
+        return {
+            'id': details['videoId'],
+            'title': details['title'],
+            'channel_id': details.get('channelId'),
+            'duration': int(details['lengthSeconds']) if details.get('lengthSeconds') else None,
+            # e.g. 2020-06-10 -> 20200610
+            'upload_date': youtube_dl.utils.unified_strdate(upload_date),
+            'view_count': int(details['viewCount']),
+            'categories': [category],
+            'automatic_captions': automatic_captions,
+            'subtitles': subtitles
+        }
+
+    @classmethod
+    def _ext_player_response_html(cls, vid_id: str, main_html: str) -> str:
+        """
+        build a minimal watch page, with just the ytInitialPlayerResponse script in it.
+        _ext_video_info extracts the same video info out of it.
+        """
+        logger = logging.getLogger("_ext_player_response_html")
+        match = cls.PLAYER_RESPONSE_RE.search(main_html)
+        if not match:
+            logger.warning("ytInitialPlayerResponse not found. keeping the full page:" + vid_id)
+            return main_html
+        try:
+            _, end = json.JSONDecoder().raw_decode(main_html, match.end() - 1)
+        except json.JSONDecodeError as jde:
+            logger.warning("ytInitialPlayerResponse not parsable. keeping the full page:{}:{}".format(vid_id, jde))
+            return main_html
+        return "<script>var {};</script>".format(main_html[match.start():end])
+
+    @classmethod
+    def _ext_caption_infos(cls, player_response: dict) -> Tuple[dict, dict]:
+        """
+        the same way youtube_dl lists them: the manual caption tracks as subtitles,
+        and the translations of the asr track as automatic captions.
+        :return: automatic_captions, subtitles
+        """
+        tracklist = player_response.get('captions', dict()).get('playerCaptionsTracklistRenderer', dict())
+        automatic_captions = dict()
+        subtitles = dict()
+        for caption_track in tracklist.get('captionTracks', list()):
+            base_url = caption_track.get('baseUrl')
+            if not base_url:
+                continue
+            if caption_track.get('kind') != "asr":
+                if caption_track.get('languageCode'):
+                    subtitles[caption_track['languageCode']] = cls._ext_caption_formats(base_url, dict())
+                continue
+            automatic_captions = {
+                translation['languageCode']: cls._ext_caption_formats(base_url,
+                                                                      {'tlang': translation['languageCode']})
+                for translation in tracklist.get('translationLanguages', list())
+                if translation.get('languageCode')
+            }
+        return automatic_captions, subtitles
+
+    @classmethod
+    def _ext_caption_formats(cls, base_url: str, query: dict) -> List[dict]:
+        return [
+            {'ext': fmt, 'url': youtube_dl.utils.update_url_query(base_url, dict(query, fmt=fmt))}
+            for fmt in cls.SUBTITLE_FORMATS
+        ]
+
 
 class ChannelRawScraper(Scraper):
     # the url to the playlist for getting all uploaded videos
@@ -205,15 +752,39 @@ class ChannelRawScraper(Scraper):
     # the show more button changes its position. find it by its class name
     SHOW_MORE_CLASS = "nextcontinuation-button"
     TIME_OUT = 10
+    # the main page & the uploads page
+    PAGES_PER_CHANNEL = 2
+    # the number of warm drivers to scrape channels with
+    NUM_DRIVERS = 3
+    # --- for scraping without a browser --- #
+    HEADERS = {
+        # get the english page
+        "Accept-Language": "en"
+    }
+    UPLOADS_PLAYLIST_URL = "https://www.youtube.com/playlist?list={}"
+    # list the videos in the playlist, without extracting each of them
+    FLAT_DL_OPTS = {
+        'extract_flat': 'in_playlist',
+        'quiet': True
+    }
+    TITLE_RE = re.compile(r'<title>([\s\S]*?)</title>')
+    # e.g. "subscriberCountText":{"accessibility":{...},"simpleText":"285K subscribers"}
+    SUBS_TEXT_RE = re.compile(r'"subscriberCountText":\{.*?"simpleText":"(.*?)"\}')
+    # e.g. <span class="c4-tabbed-header-subscriber-count secondary-text">285K subscribers</span>, on rendered pages
+    SUBS_SPAN_RE = re.compile(r'<span class="{}[^"]*"[^>]*>(.*?)</span>'.format(ChannelExtractor.SUB_CNT_CLASS))
 
     @classmethod
     def scrape(cls, channel_id: str, lang_code: str, os: str,
-               is_silent: bool = True, is_mobile: bool = True) -> ChannelRaw:
+               is_silent: bool = True, is_mobile: bool = True,
+               driver: Optional[webdriver.Chrome] = None) -> ChannelRaw:
         """
+        :param driver: a warm driver to use. if given, it is not quit after scraping.
         :return: an unparsed channel_id object
         """
         logger = logging.getLogger("scrape")
-        driver = super().get_driver(is_silent, is_mobile, os)
+        is_own_driver = driver is None
+        if is_own_driver:
+            driver = super().get_driver(is_silent, is_mobile, os)
         # get the driver
         try:
             # scrape the two html's
@@ -224,14 +795,94 @@ class ChannelRawScraper(Scraper):
         except Exception as e:
             raise e
         else:
+            if not Scraper._keep_full_pages:
+                main_html = cls._ext_main_html(main_html)
+                uploads_html = cls._build_uploads_html(ChannelExtractor._ext_video_id_list(uploads_html))
             # assign and return
             channel_raw = ChannelRaw(_id=channel_id, url=chan_url,
                                      lang_code=lang_code, main_html=main_html,
                                      uploads_html=uploads_html)
             return channel_raw
         finally:
-            logger.info("quitting the driver...")
-            driver.quit()
+            if is_own_driver:
+                logger.info("quitting the driver...")
+                driver.quit()
+
+    @classmethod
+    def scrape_browserless(cls, channel_id: str, lang_code: str) -> ChannelRaw:
+        """
+        scrape a channel without a browser. the main page is fetched over http, and the uploads are listed
+        by paginating through the uploads playlist of the channel with youtube_dl.
+        the htmls stored are minimal fragments that ChannelExtractor parses the same way.
+        :return: an unparsed channel_id object
+        """
+        logger = logging.getLogger("scrape_browserless")
+        chan_url = cls.CHAN_URL.format(channel_id)
+        logger.info("loading main page...: " + chan_url)
+        response = cls.http_get(chan_url)
+        response.raise_for_status()
+        main_html = response.text if Scraper._keep_full_pages else cls._ext_main_html(response.text)
+        # the id of the uploads playlist is the channel id, with UC replaced by UU
+        uploads_url = cls.UPLOADS_PLAYLIST_URL.format("UU" + channel_id[2:])
+        logger.info("listing uploads...: " + uploads_url)
+        with youtube_dl.YoutubeDL(cls.FLAT_DL_OPTS) as ydl:
+            playlist_info: dict = cls.extract_info(ydl, uploads_url)
+        uploads_html = cls._ext_uploads_html(playlist_info)
+        return ChannelRaw(_id=channel_id, url=chan_url,
+                          lang_code=lang_code, main_html=main_html,
+                          uploads_html=uploads_html)
+
+    @classmethod
+    def scrape_subs(cls, channel_id: str) -> int:
+        """
+        scrape just the subscriber count of a channel, over http.
+        """
+        response = cls.http_get(cls.CHAN_URL.format(channel_id))
+        response.raise_for_status()
+        return ChannelExtractor._ext_subs(cls._ext_main_html(response.text), channel_id)
+
+    @classmethod
+    def scrape_multi(cls, channels: Iterable[Tuple[str, str]], os: str,
+                     num_drivers: int = NUM_DRIVERS,
+                     max_pages: int = DriverPool.MAX_PAGES,
+                     browserless: bool = False) -> Generator[ChannelRaw, None, None]:
+        """
+        scrapes the channels in parallel, across a pool of warm drivers.
+        :param channels: (channel_id, lang_code) pairs
+        :param os: either mac or linux
+        :param num_drivers: the number of drivers to keep in the pool
+        :param max_pages: a driver is recycled after loading this many pages
+        :param browserless: if True, scrape num_drivers channels at a time without drivers.
+        :return: a generator of channel raws, in the order of completion. the ones that failed are skipped.
+        """
+        if browserless:
+            args_iter = ((channel_id, lang_code) for channel_id, lang_code in channels)
+            yield from cls._skip_failed(cls._scrape_bounded(cls.scrape_browserless, args_iter, num_drivers))
+            return
+        with DriverPool(num_drivers, os, max_pages) as pool:
+            args_iter = ((channel_id, lang_code, pool) for channel_id, lang_code in channels)
+            yield from cls._skip_failed(cls._scrape_bounded(cls._scrape_pooled, args_iter, num_drivers))
+
+    @classmethod
+    def _skip_failed(cls, results: Iterable[Tuple[tuple, Future]]) -> Generator[ChannelRaw, None, None]:
+        logger = logging.getLogger("_skip_failed")
+        for args, future in results:
+            try:
+                channel_raw = future.result()
+            except (WebDriverException,
+                    requests.exceptions.RequestException,
+                    youtube_dl.utils.DownloadError,
+                    ChannelInfoNotFoundError) as e:
+                logger.warning(str(e))
+                logger.warning("SKIP:channel_raw:" + args[0])
+                continue
+            else:
+                yield channel_raw
+
+    @classmethod
+    def _scrape_pooled(cls, channel_id: str, lang_code: str, pool: DriverPool) -> ChannelRaw:
+        with pool.lease(pages=cls.PAGES_PER_CHANNEL) as driver:
+            return cls.scrape(channel_id, lang_code, pool.os, driver=driver)
 
     @classmethod
     def _scrape_main(cls, driver: webdriver.Chrome, chan_url: str) -> str:
@@ -269,62 +920,168 @@ class ChannelRawScraper(Scraper):
         uploads_html = driver.page_source
         return uploads_html
 
+    @classmethod
+    def _ext_main_html(cls, chan_html: str) -> str:
+        """
+        build a minimal main html fragment, with the title and the subscriber count span of the channel page.
+        works for both the pages rendered by chrome, and the ones fetched over http.
+        :raises ChannelInfoNotFoundError: if the page is not a channel page (e.g. a consent or a captcha page),
+        or has no subscriber count, so that the channel is skipped.
+        """
+        title_match = cls.TITLE_RE.search(chan_html)
+        if not title_match:
+            raise ChannelInfoNotFoundError("not a channel page: title not found")
+        title = title_match.group(1).strip()  # this is already escaped
+        span_match = cls.SUBS_SPAN_RE.search(chan_html)
+        subs_match = cls.SUBS_TEXT_RE.search(chan_html)
+        if span_match:
+            subs_text = html.unescape(span_match.group(1)).strip()
+        elif subs_match:
+            subs_text = subs_match.group(1)
+        else:
+            # not 0, which general_idx does not take as a rank feature
+            raise ChannelInfoNotFoundError("subscriber count not found:" + title)
+        return "<title>{}</title>\n<span class=\"{}\">{}</span>" \
+            .format(title, ChannelExtractor.SUB_CNT_CLASS, html.escape(subs_text))
+
+    @classmethod
+    def _sub_subs(cls, main_html: str, subs: int) -> Optional[str]:
+        """
+        replace the subscriber count of a stored main html with a refreshed one, as ChannelExtractor reads it.
+        :return: the main html with the count replaced. None if it has no subscriber count span.
+        """
+        span_match = cls.SUBS_SPAN_RE.search(main_html)
+        if not span_match:
+            return None
+        start, end = span_match.span(1)
+        return "".join([main_html[:start], "{} subscribers".format(subs), main_html[end:]])
+
+    @classmethod
+    def _ext_uploads_html(cls, playlist_info: dict) -> str:
+        """
+        build a minimal uploads html fragment, with a thumbnail anchor for each entry in the playlist.
+        """
+        return cls._build_uploads_html([
+            entry['id']
+            for entry in playlist_info.get('entries', list())
+            if entry and entry.get('id', None)
+        ])
+
+    @classmethod
+    def _build_uploads_html(cls, vid_id_list: List[str]) -> str:
+        return "\n".join(
+            "<a class=\"{}\" href=\"/watch?v={}\"></a>".format(ChannelExtractor.UPLOADED_THUMB_CLASS, vid_id)
+            for vid_id in vid_id_list
+        )
+
 
 class IdiomRawScraper(Scraper):
     # https://www.igrec.ca/projects/wiktionary-text-parser/
     WIKI_PARSER_ENDPOINT = "http://www.igrec.ca/project-files/wikparser/wikparser.php"
     SLIDE_DIR = path.join(DATA_DIR, "slide")
     SLIDE_TSV_PATH = path.join(SLIDE_DIR, "slide.tsv")
+    # wiktionary entries are fairly stable
+    CACHE_TTL = 30 * 24 * 60 * 60
+
+    # the number of idioms to scrape at a time
+    MAX_WORKERS = 8
+    _parser_local = threading.local()
 
     @classmethod
-    def scrape_multi(cls) -> Generator[IdiomRaw, None, None]:
-        # load slide dataset, and iterate over the dataframe
+    def scrape_multi(cls, skip_ids: Optional[Set[str]] = None,
+                     max_workers: int = MAX_WORKERS) -> Generator[IdiomRaw, None, None]:
+        """
+        scrapes the idioms in slide.tsv concurrently, with at most max_workers idioms at a time.
+        slide.tsv is streamed, rather than loaded as a whole.
+        :param skip_ids: the ids of the idioms not to scrape, e.g. the ones already stored.
+        :param max_workers: the maximum number of idioms to scrape at a time.
+        :return: a generator of idiom raws, in the order of completion.
+        """
         logger = logging.getLogger("scrape_multi")
-        slide_df = cls._load_slide()
-        total_cnt = len(slide_df)
-        for idx, row in slide_df.iterrows():
-            idx: int
-            # get the text and wiktionary
-            idiom = row['Idiom']
-            wiktionary_url = row['WiktionaryURL']
-            # use the same id
-            idiom_id = wiktionary_url.split("/")[-1]
-            logger.info("scraping idiomRaw... ({}/{})".format(idx + 1, total_cnt))
-            try:
-                idiom_raw = cls.scrape(idiom_id, idiom, wiktionary_url)
-            except requests.exceptions.HTTPError as he:
-                logger.warning(str(he))
-                logger.warning("SKIPPED:" + wiktionary_url)
-                # skipping this one
-                continue
-            else:
-                # yield this if scraping was successful
+        skip_ids = skip_ids or set()
+        counts = {'scraped': 0, 'failed': 0, 'stored': 0}
+
+        def iter_to_scrape(html_pool: ThreadPoolExecutor) -> Generator[tuple, None, None]:
+            for args in cls._iter_slide():
+                if args[0] in skip_ids:
+                    counts['stored'] += 1
+                    continue
+                yield args + (html_pool,)
+
+        # fetches the main htmls, while the workers fetch the parser infos
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=cls.__name__ + "_html") as html_pool:
+            for args, future in cls._scrape_bounded(cls.scrape, iter_to_scrape(html_pool), max_workers):
+                try:
+                    idiom_raw = future.result()
+                except requests.exceptions.HTTPError as he:
+                    counts['failed'] += 1
+                    logger.warning(str(he))
+                    logger.warning("SKIPPED:" + args[2])
+                    # skipping this one
+                    continue
+                counts['scraped'] += 1
+                logger.info("scraped idiomRaw... ({scraped} scraped, {failed} failed, {stored} already stored)"
+                            .format(**counts))
                 yield idiom_raw
 
     @classmethod
-    def scrape(cls, idiom_id: str, idiom_text: str, wiktionary_url: str) -> IdiomRaw:
+    def scrape(cls, idiom_id: str, idiom_text: str, wiktionary_url: str,
+               html_pool: Optional[ThreadPoolExecutor] = None) -> IdiomRaw:
         """
         :param idiom_id
         :param idiom_text: e.g. Catch-22
         :param wiktionary_url: e.g. https://en.wiktionary.org/wiki/American_Dream
+        :param html_pool: if given, the main html is fetched on it, at the same time as the parser info.
         :return: an IdiomRaw object
         """
         logger = logging.getLogger("scrape")
         logger.info("loading idiom info for:[{}]...".format(idiom_text))
-        parser_info = cls._scrape_parser_info(idiom_id)
-        main_html = cls._scrape_main_html(wiktionary_url)
+        if html_pool is None:
+            parser_info = cls._scrape_parser_info(idiom_id)
+            main_html = cls._scrape_main_html(wiktionary_url)
+        else:
+            main_html_future = html_pool.submit(cls._scrape_main_html, wiktionary_url)
+            parser_info = cls._scrape_parser_info(idiom_id)
+            main_html = main_html_future.result()
         return IdiomRaw(_id=idiom_id, text=idiom_text, wiktionary_url=wiktionary_url,
                         parser_info=parser_info, main_html=main_html)
 
+    @classmethod
+    def get_parser(cls) -> WiktionaryParser:
+        """
+        get the WiktionaryParser of the current worker thread. created on the first call, and reused afterwards.
+        """
+        parser = getattr(cls._parser_local, 'parser', None)
+        if parser is None:
+            parser = WiktionaryParser()
+            # include alternative forms as well (e.g. beat around the bush = beat about the bush)
+            parser.include_relation('alternative forms')
+            # the parser gets its pages with http_get, so that they are paced, retried & cached like the others
+            parser.session = SimpleNamespace(get=cls._get_for_parser)
+            cls._parser_local.parser = parser
+        return parser
+
+    @classmethod
+    def _get_for_parser(cls, url: str, **kwargs) -> requests.Response:
+        """
+        :raises requests.exceptions.HTTPError: if the page could not be fetched (e.g. still throttled after the
+        retries), so that it is not parsed as an entry with no info.
+        """
+        response = cls.http_get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
     @classmethod
     def _scrape_parser_info(cls, idiom_id: str) -> Optional[dict]:
         logger = logging.getLogger("_scrape_parser_1_info")
-        # using this wiktionary parser
-        parser = WiktionaryParser()
-        # include alternative forms as well (e.g. beat around the bush = beat about the bush)
-        parser.include_relation('alternative forms')
         try:
-            idiom_info = parser.fetch(idiom_id)
+            idiom_info = cls.get_parser().fetch(idiom_id)
+        except requests.exceptions.HTTPError as he:
+            if he.response is None or he.response.status_code != 404:
+                raise he
+            # no entry for the idiom
+            logger.warning(str(he))
+            return None
         except AttributeError as ae:
             logger.warning(str(ae))
             return None
@@ -335,22 +1092,29 @@ class IdiomRawScraper(Scraper):
     def _scrape_main_html(cls, wiktionary_url: str) -> Optional[str]:
         logger = logging.getLogger("_scrape_main_html")
         try:
-            main_html_r = requests.get(wiktionary_url)
+            main_html_r = cls.http_get(wiktionary_url)
             main_html_r.raise_for_status()
         except requests.exceptions.HTTPError as he:
+            if he.response is None or he.response.status_code != 404:
+                # e.g. throttled. fail the idiom, rather than storing it without the html
+                raise he
             logger.warning(str(he))
             return None
         else:
             return main_html_r.text
 
     @classmethod
-    def _load_slide(cls) -> pd.DataFrame:
+    def _iter_slide(cls, slide_tsv_path: str = SLIDE_TSV_PATH) -> Generator[Tuple[str, str, str], None, None]:
         """
-        load the slide.tsv into a pandas dataframe.
-        :return:
+        stream slide.tsv, one row at a time.
+        :return: a generator of (idiom_id, idiom_text, wiktionary_url)
         """
-        slide_df = pd.read_csv(cls.SLIDE_TSV_PATH, sep="\t")
-        return slide_df
+        with open(slide_tsv_path, 'r', newline='') as fh:
+            for row in csv.DictReader(fh, delimiter="\t"):
+                wiktionary_url = row['WiktionaryURL']
+                # use the same id
+                idiom_id = wiktionary_url.split("/")[-1]
+                yield idiom_id, row['Idiom'], wiktionary_url
 
 
 # class MLGlossHTMLScraper(Scraper):
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from youtora.collect.caches import HttpCache
+from youtora.collect.scrapers import Scraper, TracksRawScraper
+
+
+class HttpCacheTestCase(TestCase):
+    url = "https://www.youtube.com/api/timedtext?v=abc&lang=en&fmt=srv1"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.http_cache = HttpCache(cache_dir=self.tmp_dir.name, max_bytes=10 ** 6)
+
+    def tearDown(self):
+        Scraper.use_cache(None)
+        self.tmp_dir.cleanup()
+
+    def _response(self, status_code: int, content: bytes = b"", headers: dict = None) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers.update(headers or dict())
+        response.encoding = "utf-8"
+        return response
+
+    def test_put_and_get(self):
+        self.http_cache.put(self.url, {"Accept-Language": "en"}, self._response(200, b"<transcript/>"))
+        cached = self.http_cache.get(self.url, {"Accept-Language": "en"})
+        self.assertEqual("<transcript/>", cached.to_response().text)
+        # the headers are part of the key
+        self.assertIsNone(self.http_cache.get(self.url, {"Accept-Language": "ko"}))
+
+    def test_evicts_least_recently_used(self):
+        http_cache = HttpCache(cache_dir=self.tmp_dir.name, max_bytes=3000)
+        for idx in range(5):
+            http_cache.put(self.url + str(idx), dict(), self._response(200, b"x" * 1000))
+        self.assertLessEqual(sum(entry.stat().st_size for entry in os.scandir(self.tmp_dir.name)), 3000)
+        self.assertIsNone(http_cache.get(self.url + "0", dict()))
+        self.assertIsNotNone(http_cache.get(self.url + "4", dict()))
+
+    def test_http_get_returns_fresh_without_request(self):
+        Scraper.use_cache(self.http_cache)
+        session = MagicMock()
+        session.get.return_value = self._response(200, b"<transcript/>")
+        with patch.object(TracksRawScraper, 'get_session', return_value=session):
+            TracksRawScraper.http_get(self.url)
+            response = TracksRawScraper.http_get(self.url)
+        self.assertEqual(1, session.get.call_count)
+        self.assertEqual("<transcript/>", response.text)
+
+    def test_http_get_revalidates_stale(self):
+        Scraper.use_cache(self.http_cache)
+        session = MagicMock()
+        session.get.side_effect = [self._response(200, b"<transcript/>", {"ETag": "\"v1\""}),
+                                   self._response(304)]
+        with patch.object(TracksRawScraper, 'get_session', return_value=session), \
+                patch.object(TracksRawScraper, 'CACHE_TTL', 0):
+            TracksRawScraper.http_get(self.url)
+            response = TracksRawScraper.http_get(self.url)
+        self.assertEqual("\"v1\"", session.get.call_args[1]['headers']['If-None-Match'])
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("<transcript/>", response.text)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from youtora.collect.fields import CompressedTextField
+from youtora.collect.models import TracksRaw
+
+
+class CompressedTextFieldTestCase(TestCase):
+    raw_xml = "<transcript><text start=\"0.1\" dur=\"1.2\">hello</text></transcript>" * 100
+    field = TracksRaw._meta.get_field('raw_xml')
+
+    def _from_db(self, raw_xml) -> TracksRaw:
+        return TracksRaw.from_db('default', ['_id', 'caption_id', 'raw_xml'],
+                                 ["vid|auto|en|tracks", "vid|auto|en", raw_xml])
+
+    def test_get_prep_value_compresses(self):
+        blob = self.field.get_prep_value(self.raw_xml)
+        self.assertIsInstance(blob, bytes)
+        self.assertLess(len(blob), len(self.raw_xml))
+        # already compressed ones are not compressed again
+        self.assertEqual(blob, self.field.get_prep_value(blob))
+        self.assertIsNone(self.field.get_prep_value(None))
+
+    def test_decompresses_lazily(self):
+        tracks_raw = self._from_db(CompressedTextField.compress(self.raw_xml))
+        self.assertIsInstance(tracks_raw.__dict__['raw_xml'], bytes)
+        self.assertEqual(self.raw_xml, tracks_raw.raw_xml)
+        self.assertIsInstance(tracks_raw.__dict__['raw_xml'], str)
+
+    def test_reads_legacy_strings(self):
+        tracks_raw = self._from_db(self.raw_xml)
+        self.assertEqual(self.raw_xml, tracks_raw.raw_xml)
+
+    def test_pre_save_does_not_decompress(self):
+        blob = CompressedTextField.compress(self.raw_xml)
+        tracks_raw = self._from_db(blob)
+        self.assertEqual(blob, self.field.get_db_prep_save(self.field.pre_save(tracks_raw, add=False), None))
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from youtora.collect.limiters import HostRateLimiter
+
+
+class HostRateLimiterTestCase(TestCase):
+    host = "www.youtube.com"
+
+    def test_on_throttle_slows_down(self):
+        limiter = HostRateLimiter(init_rate=4.0, min_rate=1.0)
+        limiter.on_throttle(self.host)
+        self.assertEqual(2.0, limiter.get_rate(self.host))
+        limiter.on_throttle(self.host)
+        limiter.on_throttle(self.host)
+        self.assertEqual(1.0, limiter.get_rate(self.host))
+
+    def test_on_success_speeds_up(self):
+        limiter = HostRateLimiter(init_rate=1.0, max_rate=1.5)
+        for _ in range(3):
+            limiter.on_success(self.host)
+        self.assertAlmostEqual(1.3, limiter.get_rate(self.host))
+        for _ in range(10):
+            limiter.on_success(self.host)
+        self.assertEqual(1.5, limiter.get_rate(self.host))
+
+    def test_hosts_are_independent(self):
+        limiter = HostRateLimiter(init_rate=4.0)
+        limiter.on_throttle(self.host)
+        self.assertEqual(4.0, limiter.get_rate("en.wiktionary.org"))
+
+    def test_acquire_is_immediate_within_burst(self):
+        limiter = HostRateLimiter(init_rate=0.01, burst=3)
+        for _ in range(3):
+            limiter.acquire(self.host)  # would take minutes if it were not for the burst
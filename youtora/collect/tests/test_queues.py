@@ -0,0 +1,71 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from youtora.collect.facades import ScrapeYouTubeJobs
+from youtora.collect.models import TracksRaw, VideoRaw
+from youtora.collect.queues import ScrapeQueue, LeaseHeartbeat
+from youtora.collect.schedulers import Signals
+from youtora.collect.scrapers import TracksRawScraper
+
+
+class ScrapeQueueTestCase(TestCase):
+
+    @patch.object(ScrapeQueue, 'get_collection')
+    def test_fail_requeues_until_max_attempts(self, get_collection):
+        collection = MagicMock()
+        get_collection.return_value = collection
+        ScrapeQueue.fail({'_id': "video|abc", 'owner': "w", 'attempts': 1}, "error")
+        self.assertEqual(ScrapeQueue.PENDING, collection.update_one.call_args[0][1]['$set']['status'])
+        ScrapeQueue.fail({'_id': "video|abc", 'owner': "w", 'attempts': ScrapeQueue.MAX_ATTEMPTS}, "error")
+        self.assertEqual(ScrapeQueue.FAILED, collection.update_one.call_args[0][1]['$set']['status'])
+
+
+class ScrapeYouTubeJobsTestCase(TestCase):
+
+    @patch.object(ScrapeQueue, 'requeue_expired', return_value=0)
+    @patch.object(ScrapeQueue, 'has_leased', return_value=False)
+    @patch.object(ScrapeQueue, 'complete')
+    @patch.object(ScrapeQueue, 'fail')
+    @patch.object(ScrapeQueue, 'lease')
+    def test_work_records_failures_and_carries_on(self, lease, fail, complete, *_):
+        jobs = [{'_id': "caption|1", 'kind': "caption"}, {'_id': "caption|2", 'kind': "caption"}]
+        lease.side_effect = jobs + [None]
+        with patch.object(ScrapeYouTubeJobs, '_scrape_job', side_effect=[ValueError("oops"), None]):
+            ScrapeYouTubeJobs._work("w", "linux", False, LeaseHeartbeat(), forever=False)
+        fail.assert_called_once_with(jobs[0], repr(ValueError("oops")))
+        complete.assert_called_once_with(jobs[1])
+
+    @patch.object(ScrapeQueue, 'requeue_expired', return_value=0)
+    @patch.object(ScrapeQueue, 'has_leased', return_value=False)
+    @patch.object(ScrapeQueue, 'complete')
+    @patch.object(ScrapeQueue, 'fail')
+    @patch.object(ScrapeQueue, 'lease')
+    @patch.object(TracksRawScraper, '_scrape_raw_xml', return_value=None)
+    @patch.object(ScrapeYouTubeJobs, '_upsert')
+    def test_work_fails_captions_not_downloaded(self, upsert, _, lease, fail, complete, *__):
+        job = {'_id': "caption|abc|auto|en", 'kind': "caption", 'owner': "w", 'attempts': 1,
+               'payload': {'id': "abc|auto|en", 'video_id': "abc", 'is_auto': True, 'lang_code': "en",
+                           'url': "https://www.youtube.com/api/timedtext?v=abc"}}
+        lease.side_effect = [job, None]
+        with patch.object(TracksRaw, 'objects') as objects:
+            objects.filter.return_value.exists.return_value = False
+            ScrapeYouTubeJobs._work("w", "linux", False, LeaseHeartbeat(), forever=False)
+        objects.filter.assert_called_once_with(caption_id="abc|auto|en", raw_xml__isnull=False)
+        fail.assert_called_once()
+        self.assertIn("raw_xml not downloaded", fail.call_args[0][1])
+        complete.assert_not_called()
+        upsert.assert_not_called()
+
+    def test_caption_signals_tolerate_missing_video_info(self):
+        vid_raw = VideoRaw(_id="abc", video_info={'view_count': 100, 'categories': None})
+        self.assertEqual(Signals(subs=10, views=100), ScrapeYouTubeJobs._get_caption_signals(vid_raw, 10))
+
+    @patch.object(ScrapeQueue, 'heartbeat', return_value=True)
+    def test_heartbeat_renews_held_leases(self, heartbeat):
+        job = {'_id': "video|abc", 'owner': "w"}
+        with LeaseHeartbeat(lease_secs=0.03) as lease_heartbeat:
+            lease_heartbeat.hold(job)
+            time.sleep(0.05)
+            lease_heartbeat.release(job)
+        heartbeat.assert_called_with(job, 0.03)
@@ -0,0 +1,42 @@
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from youtora.collect.models import ChannelRaw
+from youtora.collect.schedulers import ScrapeScheduler, Signals
+
+
+class ScrapeSchedulerTestCase(TestCase):
+
+    def test_score_ranks_by_signals(self):
+        scheduler = ScrapeScheduler()
+        today = timezone.now().date()
+        popular = Signals(subs=10 ** 6, views=10 ** 6, publish_date=today)
+        unpopular = Signals(subs=10 ** 2, views=10 ** 2, publish_date=today)
+        old = Signals(subs=10 ** 6, views=10 ** 6, publish_date=today - timedelta(days=3650))
+        self.assertGreater(scheduler.score(popular), scheduler.score(unpopular))
+        self.assertGreater(scheduler.score(popular), scheduler.score(old))
+
+    def test_score_favours_stale_raws(self):
+        scheduler = ScrapeScheduler()
+        fresh = Signals(views=10 ** 3, scraped_at=timezone.now())
+        stale = Signals(views=10 ** 3, scraped_at=timezone.now() - timedelta(days=60))
+        self.assertGreater(scheduler.score(stale), scheduler.score(fresh))
+        self.assertEqual(scheduler.score(stale), scheduler.score(Signals(views=10 ** 3)))
+
+    def test_weights_override(self):
+        scheduler = ScrapeScheduler({'views': 0.0, 'staleness': 0.0})
+        self.assertEqual(0.0, scheduler.score(Signals(views=10 ** 6)))
+        self.assertEqual(ScrapeScheduler.WEIGHTS['subs'], scheduler.weights['subs'])
+
+    def test_get_subs_skips_unparsable_channels(self):
+        channel_raws = [
+            ChannelRaw(_id="UC1", main_html="<span class=\"c4-tabbed-header-subscriber-count\">285K subscribers</span>"),
+            ChannelRaw(_id="UC2", main_html="<html><title>a consent page</title></html>"),
+            ChannelRaw(_id="UC3", main_html="")
+        ]
+        with patch.object(ChannelRaw, 'objects') as objects:
+            objects.filter.return_value.only.return_value = channel_raws
+            self.assertEqual({'UC1': 285000}, ScrapeScheduler._get_subs(["UC1", "UC2", "UC3"]))
@@ -0,0 +1,286 @@
+import json
+import tempfile
+import threading
+import time
+from os import path
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+import requests
+import youtube_dl
+
+from youtora.collect.models import ChannelRaw, IdiomRaw, VideoRaw
+from youtora.collect.scrapers import (
+    Scraper,
+    DriverPool,
+    VideoRawScraper,
+    TracksRawScraper,
+    ChannelRawScraper,
+    IdiomRawScraper
+)
+from youtora.refine.errors import ChannelInfoNotFoundError
+from youtora.refine.extractors import ChannelExtractor, VideoExtractor, CaptionExtractor
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "fixtures")
+
+
+class ScraperTestCase(TestCase):
+    MAX_IN_FLIGHT = 3
+
+    def test_scrape_bounded_yields_all(self):
+        args_iter = ((idx,) for idx in range(20))
+        results = [
+            future.result()
+            for _, future in Scraper._scrape_bounded(lambda x: x * 2, args_iter, self.MAX_IN_FLIGHT)
+        ]
+        self.assertEqual(sorted(results), [idx * 2 for idx in range(20)])
+
+    def test_scrape_bounded_respects_max_in_flight(self):
+        lock = threading.Lock()
+        counts = {'curr': 0, 'max': 0}
+
+        def scrape_func(_):
+            with lock:
+                counts['curr'] += 1
+                counts['max'] = max(counts['max'], counts['curr'])
+            time.sleep(0.01)
+            with lock:
+                counts['curr'] -= 1
+
+        args_iter = ((idx,) for idx in range(20))
+        for _, future in Scraper._scrape_bounded(scrape_func, args_iter, self.MAX_IN_FLIGHT):
+            future.result()
+        self.assertLessEqual(counts['max'], self.MAX_IN_FLIGHT)
+
+    def test_scrape_bounded_defers_exceptions(self):
+        def scrape_func(x):
+            if x == 1:
+                raise ValueError(x)
+            return x
+
+        args_iter = ((idx,) for idx in range(3))
+        errors = list()
+        for args, future in Scraper._scrape_bounded(scrape_func, args_iter, self.MAX_IN_FLIGHT):
+            try:
+                future.result()
+            except ValueError:
+                errors.append(args)
+        self.assertEqual([(1,)], errors)
+
+    def test_get_session_is_shared(self):
+        self.assertIs(VideoRawScraper.get_session(), VideoRawScraper.get_session())
+        self.assertIsNot(VideoRawScraper.get_session(), TracksRawScraper.get_session())
+
+    def test_get_session_has_default_headers(self):
+        session = VideoRawScraper.get_session()
+        for key, value in VideoRawScraper.HEADERS.items():
+            self.assertEqual(value, session.headers[key])
+
+    @patch.object(Scraper, '_rate_limiter')
+    @patch('time.sleep')
+    def test_http_get_retries_with_backoff(self, sleep, rate_limiter):
+        session = MagicMock()
+        session.get.side_effect = [self._response(503, {'Retry-After': "2"}), self._response(200)]
+        with patch.object(TracksRawScraper, 'get_session', return_value=session):
+            response = TracksRawScraper.http_get("https://www.youtube.com/api/timedtext")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, session.get.call_count)
+        self.assertGreaterEqual(sleep.call_args[0][0], 2)
+        rate_limiter.on_throttle.assert_called_once_with("www.youtube.com", 2)
+
+    @patch.object(Scraper, '_rate_limiter')
+    @patch('time.sleep')
+    def test_http_get_returns_last_response_when_retries_run_out(self, *_):
+        session = MagicMock()
+        session.get.return_value = self._response(500)
+        with patch.object(TracksRawScraper, 'get_session', return_value=session):
+            response = TracksRawScraper.http_get("https://www.youtube.com/api/timedtext")
+        self.assertEqual(500, response.status_code)
+        self.assertEqual(TracksRawScraper.MAX_RETRIES + 1, session.get.call_count)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(120, Scraper._parse_retry_after("120"))
+        self.assertEqual(0, Scraper._parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"))
+        self.assertIsNone(Scraper._parse_retry_after(None))
+
+    def _response(self, status_code: int, headers: dict = None) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or dict())
+        return response
+
+
+class DriverPoolTestCase(TestCase):
+
+    @patch.object(Scraper, 'get_driver', side_effect=lambda *args: MagicMock())
+    def test_lease_reuses_driver(self, _):
+        with DriverPool(size=1, os="linux", max_pages=10) as pool:
+            with pool.lease(pages=2) as driver_1:
+                pass
+            with pool.lease(pages=2) as driver_2:
+                pass
+        self.assertIs(driver_1, driver_2)
+        driver_1.quit.assert_called_once()
+
+    @patch.object(Scraper, 'get_driver', side_effect=lambda *args: MagicMock())
+    def test_lease_recycles_driver_after_max_pages(self, _):
+        with DriverPool(size=1, os="linux", max_pages=4) as pool:
+            with pool.lease(pages=2) as driver_1:
+                pass
+            with pool.lease(pages=2) as driver_2:
+                pass
+            with pool.lease(pages=2) as driver_3:
+                pass
+        self.assertIs(driver_1, driver_2)
+        self.assertIsNot(driver_2, driver_3)
+        driver_1.quit.assert_called_once()
+
+
+class VideoRawScraperTestCase(TestCase):
+    # a recorded watch page
+    with open(path.join(FIXTURES_DIR, "watch_page.html"), 'r') as fh:
+        main_html = fh.read()
+
+    def test_single_fetch_video_raw_is_parsable(self):
+        video_info = VideoRawScraper._ext_video_info("0IAPZzGSbME", self.main_html)
+        video_raw = VideoRaw(_id="0IAPZzGSbME", url=VideoRawScraper.VID_URL_FORMAT.format("0IAPZzGSbME"),
+                             channel_id="UCZCFT11CWBi3MHNlGf019nw", main_html=self.main_html, video_info=video_info)
+        video = VideoExtractor.parse(video_raw)
+        self.assertEqual("1. Introduction to Algorithms", video.title)
+        self.assertEqual("2018-01-15", video.publish_date)
+        self.assertEqual(2374569, video.views)
+        self.assertEqual("Education", video.category)
+        captions = {caption.id: caption for caption in CaptionExtractor.parse(video_raw)}
+        self.assertEqual({"0IAPZzGSbME|manual|en", "0IAPZzGSbME|auto|fr", "0IAPZzGSbME|auto|ko"}, set(captions))
+        self.assertIn("fmt=srv1", captions["0IAPZzGSbME|manual|en"].url)
+        self.assertIn("tlang=fr", captions["0IAPZzGSbME|auto|fr"].url)
+
+    def test_projected_video_info_parses_the_same(self):
+        video_info = VideoRawScraper._ext_video_info("0IAPZzGSbME", self.main_html)
+        video_info.update({'formats': [{'url': "https://..."}] * 10, 'thumbnails': [{'url': "https://..."}]})
+        video_info['automatic_captions']['de'] = video_info['automatic_captions']['fr']
+        projected = VideoRawScraper.project_video_info(video_info)
+        self.assertNotIn('formats', projected)
+        self.assertNotIn('de', projected['automatic_captions'])
+        full_raw, projected_raw = (VideoRaw(_id="0IAPZzGSbME", channel_id="UCZCFT11CWBi3MHNlGf019nw", video_info=info)
+                                   for info in (video_info, projected))
+        self.assertEqual(VideoExtractor.parse(full_raw), VideoExtractor.parse(projected_raw))
+        self.assertEqual(CaptionExtractor.parse(full_raw), CaptionExtractor.parse(projected_raw))
+
+    def test_player_response_html_keeps_the_video_info(self):
+        minimal_html = VideoRawScraper._ext_player_response_html("0IAPZzGSbME", self.main_html)
+        self.assertLess(len(minimal_html), len(self.main_html))
+        self.assertNotIn("ytInitialData", minimal_html)
+        self.assertEqual(VideoRawScraper._ext_video_info("0IAPZzGSbME", self.main_html),
+                         VideoRawScraper._ext_video_info("0IAPZzGSbME", minimal_html))
+
+    def test_truncated_player_response_is_skipped(self):
+        truncated_html = self.main_html[:self.main_html.index("ytInitialPlayerResponse") + 200]
+        with self.assertRaises(youtube_dl.utils.DownloadError):
+            VideoRawScraper._ext_video_info("0IAPZzGSbME", truncated_html)
+        self.assertEqual(truncated_html, VideoRawScraper._ext_player_response_html("0IAPZzGSbME", truncated_html))
+
+    def test_scrape_views(self):
+        with patch.object(VideoRawScraper, '_scrape_main_html', return_value=self.main_html):
+            self.assertEqual(2374569, VideoRawScraper.scrape_views("0IAPZzGSbME"))
+
+    def test_single_fetch_skips_unplayable_videos(self):
+        with self.assertRaises(youtube_dl.utils.DownloadError):
+            VideoRawScraper._ext_video_info("0IAPZzGSbME", "<html></html>")
+
+    def test_single_fetch_skips_videos_without_microformat(self):
+        player_response = {
+            'playabilityStatus': {'status': "OK"},
+            'videoDetails': {'videoId': "0IAPZzGSbME", 'title': "1. Introduction to Algorithms",
+                             'lengthSeconds': "600", 'viewCount': "2374569"}
+        }
+        main_html = "<script>var ytInitialPlayerResponse = {};</script>".format(json.dumps(player_response))
+        with self.assertRaises(youtube_dl.utils.DownloadError):
+            VideoRawScraper._ext_video_info("0IAPZzGSbME", main_html)
+
+
+class ChannelRawScraperTestCase(TestCase):
+    # recorded responses
+    with open(path.join(FIXTURES_DIR, "channel_main.html"), 'r') as fh:
+        chan_html = fh.read()
+    with open(path.join(FIXTURES_DIR, "uploads_flat.json"), 'r') as fh:
+        playlist_info = json.loads(fh.read())
+
+    def test_browserless_channel_raw_is_parsable(self):
+        channel_raw = ChannelRaw(_id="UCZCFT11CWBi3MHNlGf019nw",
+                                 url="https://www.youtube.com/channel/UCZCFT11CWBi3MHNlGf019nw",
+                                 lang_code="en",
+                                 main_html=ChannelRawScraper._ext_main_html(self.chan_html),
+                                 uploads_html=ChannelRawScraper._ext_uploads_html(self.playlist_info))
+        channel = ChannelExtractor.parse(channel_raw)
+        self.assertEqual("Abdul Bari", channel.title)
+        self.assertEqual(285000, channel.subs)
+        self.assertEqual(["0IAPZzGSbME", "9TlHvipP5yA", "FxCUaG1h1Wo"], channel.vid_id_list)
+
+    def test_minimal_htmls_of_rendered_pages_parse_the_same(self):
+        main_html = "<html><head><title>Abdul Bari - YouTube</title><script>var x = 1;</script></head><body>" \
+                    "<span class=\"c4-tabbed-header-subscriber-count secondary-text\">285K subscribers</span>" \
+                    "</body></html>"
+        uploads_html = "<html><body>" + "".join(
+            "<div><a class=\"compact-media-item-image\" href=\"/watch?v={}\"><img src=\"x.jpg\"></a></div>"
+            .format(vid_id) for vid_id in ("0IAPZzGSbME", "9TlHvipP5yA")) + "</body></html>"
+        full_raw = ChannelRaw(_id="UCZCFT11CWBi3MHNlGf019nw", main_html=main_html, uploads_html=uploads_html)
+        minimal_raw = ChannelRaw(_id="UCZCFT11CWBi3MHNlGf019nw",
+                                 main_html=ChannelRawScraper._ext_main_html(main_html),
+                                 uploads_html=ChannelRawScraper._build_uploads_html(
+                                     ChannelExtractor._ext_video_id_list(uploads_html)))
+        self.assertEqual(ChannelExtractor.parse(full_raw), ChannelExtractor.parse(minimal_raw))
+
+    def test_ext_main_html_rejects_pages_that_are_not_channel_pages(self):
+        # e.g. a consent page
+        with self.assertRaises(ChannelInfoNotFoundError):
+            ChannelRawScraper._ext_main_html("<html><body><form action=\"consent\"></form></body></html>")
+        # no subscriber count to store
+        with self.assertRaises(ChannelInfoNotFoundError):
+            ChannelRawScraper._ext_main_html("<html><head><title>Abdul Bari - YouTube</title></head></html>")
+
+
+class IdiomRawScraperTestCase(TestCase):
+    SLIDE_TSV = "Idiom\tWiktionaryURL\n" \
+                "Catch-22\thttps://en.wiktionary.org/wiki/Catch-22\n" \
+                "American Dream\thttps://en.wiktionary.org/wiki/American_Dream\n"
+
+    def test_iter_slide(self):
+        with tempfile.NamedTemporaryFile('w', suffix=".tsv") as fh:
+            fh.write(self.SLIDE_TSV)
+            fh.flush()
+            rows = list(IdiomRawScraper._iter_slide(fh.name))
+        self.assertEqual([("Catch-22", "Catch-22", "https://en.wiktionary.org/wiki/Catch-22"),
+                          ("American_Dream", "American Dream", "https://en.wiktionary.org/wiki/American_Dream")],
+                         rows)
+
+    def test_scrape_multi_skips_stored_idioms(self):
+        rows = [("Catch-22", "Catch-22", "https://en.wiktionary.org/wiki/Catch-22"),
+                ("American_Dream", "American Dream", "https://en.wiktionary.org/wiki/American_Dream")]
+        with patch.object(IdiomRawScraper, '_iter_slide', return_value=iter(rows)), \
+                patch.object(IdiomRawScraper, 'scrape', side_effect=lambda *args: IdiomRaw(_id=args[0])) as scrape:
+            idiom_raws = list(IdiomRawScraper.scrape_multi(skip_ids={"Catch-22"}, max_workers=2))
+        self.assertEqual(["American_Dream"], [idiom_raw.id for idiom_raw in idiom_raws])
+        # the main htmls are fetched on a pool of the run, shut down once the run is over
+        html_pool = scrape.call_args[0][3]
+        self.assertEqual(2, html_pool._max_workers)
+        with self.assertRaises(RuntimeError):
+            html_pool.submit(print)
+
+    def test_get_parser_is_reused_per_thread(self):
+        self.assertIs(IdiomRawScraper.get_parser(), IdiomRawScraper.get_parser())
+
+    @patch.object(Scraper, '_rate_limiter')
+    @patch('time.sleep')
+    def test_throttled_parser_info_fails(self, _, rate_limiter):
+        response = requests.Response()
+        response.status_code = 429
+        session = MagicMock()
+        session.get.return_value = response
+        with patch.object(IdiomRawScraper, 'get_session', return_value=session):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                IdiomRawScraper._scrape_parser_info("Catch-22")
+        # the parser's requests go through the limiter as well
+        self.assertEqual(IdiomRawScraper.MAX_RETRIES + 1, session.get.call_count)
+        rate_limiter.acquire.assert_called_with("en.wiktionary.org")
+        rate_limiter.on_throttle.assert_called_with("en.wiktionary.org", None)
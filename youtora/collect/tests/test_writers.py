@@ -0,0 +1,54 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from pymongo.errors import BulkWriteError
+
+from youtora.collect.fields import CompressedTextField
+from youtora.collect.models import TracksRaw
+from youtora.collect.writers import BulkRawWriter
+
+
+class BulkRawWriterTestCase(TestCase):
+
+    def _writer(self, flush_size: int) -> BulkRawWriter:
+        writer = BulkRawWriter(TracksRaw, flush_size=flush_size, flush_interval=60)
+        writer._collection = MagicMock()
+        return writer
+
+    def _tracks_raw(self, caption_id: str) -> TracksRaw:
+        return TracksRaw(_id="|".join([caption_id, "tracks"]),
+                         caption_id=caption_id,
+                         raw_xml="<transcript></transcript>")
+
+    def test_add_flushes_one_bulk_write_per_batch(self):
+        writer = self._writer(flush_size=2)
+        for idx in range(5):
+            writer.add(self._tracks_raw("vid{}|auto|en".format(idx)))
+        self.assertEqual(2, writer._collection.bulk_write.call_count)
+        writer.flush()
+        self.assertEqual(3, writer._collection.bulk_write.call_count)
+
+    def test_add_skips_invalid(self):
+        writer = self._writer(flush_size=2)
+        self.assertFalse(writer.add(self._tracks_raw("")))  # caption_id must not be blank
+        self.assertEqual(1, len(writer.failures))
+        writer.flush()
+        writer._collection.bulk_write.assert_not_called()
+
+    def test_to_doc(self):
+        writer = self._writer(flush_size=2)
+        doc = writer._to_doc(self._tracks_raw("vid|auto|en"))
+        self.assertEqual({'_id': "vid|auto|en|tracks",
+                          'caption_id': "vid|auto|en",
+                          # stored compressed
+                          'raw_xml': CompressedTextField.compress("<transcript></transcript>")}, doc)
+
+    def test_flush_records_failures_without_aborting(self):
+        writer = self._writer(flush_size=10)
+        writer._collection.bulk_write.side_effect = BulkWriteError({
+            'writeErrors': [{'index': 1, 'errmsg': "duplicate key"}]
+        })
+        for idx in range(3):
+            writer.add(self._tracks_raw("vid{}|auto|en".format(idx)))
+        self.assertEqual(2, writer.flush())
+        self.assertEqual([("vid1|auto|en|tracks", "duplicate key")], writer.failures)
@@ -0,0 +1,115 @@
+import logging
+import time
+from typing import List, Tuple, Type
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from djongo import models
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+
+class BulkRawWriter:
+    """
+    buffers raw model objects (VideoRaw, TracksRaw, IdiomRaw), and upserts them to mongo
+    with one bulk write per batch, instead of several djongo round trips per object.
+    fields are validated in memory with clean_fields(). uniqueness is guaranteed by upserting on _id.
+    """
+    # flush when this many objects are buffered
+    FLUSH_SIZE = 100
+    # or when this many seconds have passed since the last flush (checked on add)
+    FLUSH_INTERVAL = 30.0
+
+    def __init__(self, model: Type[models.Model],
+                 flush_size: int = FLUSH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.model = model
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.written_cnt = 0
+        # (id, error message) of the objects that failed to be validated or written
+        self.failures: List[Tuple[str, str]] = list()
+        self._buffer: List[models.Model] = list()
+        self._last_flush = time.monotonic()
+        self._collection = None
+
+    def __enter__(self) -> 'BulkRawWriter':
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def add(self, raw: models.Model) -> bool:
+        """
+        validate the raw object, and buffer it to be written.
+        :return: True if the raw object was valid, False otherwise
+        """
+        logger = logging.getLogger("add")
+        try:
+            raw.clean_fields()
+        except ValidationError as ve:
+            logger.warning(str(ve))
+            logger.warning("SKIP:{}:{}".format(self.model.__name__, raw.pk))
+            self.failures.append((raw.pk, str(ve)))
+            return False
+        self._buffer.append(raw)
+        if len(self._buffer) >= self.flush_size \
+                or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """
+        upsert all the buffered objects with a single bulk write.
+        failures of individual documents are recorded, and do not abort the rest of the batch.
+        :return: the number of documents written
+        """
+        logger = logging.getLogger("flush")
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, list()
+        requests = [
+            ReplaceOne({'_id': raw.pk}, self._to_doc(raw), upsert=True)
+            for raw in batch
+        ]
+        try:
+            result = self._get_collection().bulk_write(requests, ordered=False)
+        except BulkWriteError as bwe:
+            write_errors = bwe.details.get('writeErrors', list())
+            for write_error in write_errors:
+                raw_id = batch[write_error['index']].pk
+                logger.warning("FAILED:{}:{}:{}".format(self.model.__name__, raw_id, write_error['errmsg']))
+                self.failures.append((raw_id, write_error['errmsg']))
+            written_cnt = len(batch) - len(write_errors)
+        else:
+            written_cnt = result.upserted_count + result.matched_count
+        self.written_cnt += written_cnt
+        logger.info("{} flushed:(batch={}, written={}, total_written={}, total_failed={})"
+                    .format(self.model.__name__, len(batch), written_cnt,
+                            self.written_cnt, len(self.failures)))
+        return written_cnt
+
+    def _to_doc(self, raw: models.Model) -> dict:
+        """
+        the document djongo would have stored for this object.
+        """
+        return {
+            field.column: field.get_db_prep_save(field.pre_save(raw, add=True), connection)
+            for field in self.model._meta.concrete_fields
+        }
+
+    def _get_collection(self) -> Collection:
+        if self._collection is None:
+            self._collection = self.get_collection(self.model)
+        return self._collection
+
+    @classmethod
+    def get_collection(cls, model: Type[models.Model]) -> Collection:
+        """
+        get the pymongo collection of a model, to bypass djongo's sql translation.
+        """
+        connection.ensure_connection()
+        # djongo's connection is a pymongo database
+        return connection.connection[model._meta.db_table]
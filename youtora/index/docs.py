@@ -51,6 +51,8 @@ class GeneralDoc(Document):
     next_id = Keyword()
     context = Text()
     caption = Object(CaptionInnerDoc)
+    # the digest of the fields above, except for the counts. to tell whether a doc has changed
+    digest = Keyword(index=False)
 
     class Index:
         name = "general_idx"
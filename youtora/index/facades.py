@@ -1,12 +1,21 @@
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import sys
-from typing import Generator, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Generator, Iterable, List, Optional, Set, Tuple
 
+import django
+import requests
+import youtube_dl
 from django.core.exceptions import ObjectDoesNotExist
 from elasticsearch.helpers import bulk
-from elasticsearch_dsl import Search
+from elasticsearch_dsl import Search, UpdateByQuery
+from pymongo import UpdateOne
 from termcolor import colored
 
 from youtora.collect.models import (
@@ -14,6 +23,8 @@ from youtora.collect.models import (
     VideoRaw,
     TracksRaw
 )
+from youtora.collect.scrapers import Scraper, ChannelRawScraper, VideoRawScraper
+from youtora.collect.writers import BulkRawWriter
 from youtora.index.docs import (
     es_client,
     ChannelInnerDoc,
@@ -22,7 +33,9 @@ from youtora.index.docs import (
     GeneralDoc,
     OpenSubDoc,  # for searching opensub data.
 )
+from youtora.refine.contexts import ContextBuilder
 from youtora.refine.dataclasses import Video, Channel, Caption
+from youtora.refine.errors import ChannelInfoNotFoundError
 from youtora.refine.extractors import (
     ChannelExtractor,
     VideoExtractor,
@@ -39,44 +52,150 @@ es_logger.setLevel(logging.WARNING)  # suppress the logs from es_client.
 
 
 class BuildGeneralIdx:
-    VIDEO_BATCH_SIZE = 10
+    """
+    the ids of the general docs are the stable ids of the tracks, so a channel is built incrementally:
+    only the docs that are new or have changed are indexed, and the ones that are not built anymore are deleted.
+    the general_idx built before the ids were stable is migrated by running migrate_idx (for the digest field)
+    and then building it once as usual; the docs of the old ids are deleted as they are not built anymore.
+    """
     IDX_NAME = GeneralDoc.Index.name
+    DIGEST_SIZE = 16
+    # the raws are refined on a pool of this many processes, while the docs are indexed in this one.
+    NUM_WORKERS = os.cpu_count() or 1
+    # the number of videos each worker may refine ahead of the indexing
+    IN_FLIGHT_PER_WORKER = 2
 
     @classmethod
-    def exec(cls, channel_id: str):
+    def exec(cls, channel_id: str, full: bool = False, context_builder: Optional[ContextBuilder] = None,
+             num_workers: int = NUM_WORKERS):
+        """
+        :param full: if True, delete all the docs of the channel and index them again,
+        instead of indexing the ones that have changed only.
+        :param context_builder: builds the contexts of the tracks. TrackExtractor.CONTEXT_BUILDER if not given.
+        :param num_workers: the number of processes to refine the raws with. if 1, they are refined in this one.
+        """
+        with cls._get_pool(num_workers) as pool:
+            cls._exec(channel_id, full, context_builder, pool, num_workers)
+
+    @classmethod
+    def exec_multi(cls, full: bool = False, context_builder: Optional[ContextBuilder] = None,
+                   num_workers: int = NUM_WORKERS):
+        """
+        build indices for all channels stored, sharing the pool of workers across the channels.
+        :return:
+        """
+        chan_ids = list(ChannelRaw.objects.values_list('_id', flat=True))
+        with cls._get_pool(num_workers) as pool:
+            for chan_id in chan_ids:
+                cls._exec(chan_id, full, context_builder, pool, num_workers)
+
+    @classmethod
+    def _exec(cls, channel_id: str, full: bool, context_builder: Optional[ContextBuilder],
+              pool: Optional[ProcessPoolExecutor], num_workers: int):
         logger = logging.getLogger("exec")
-        cls._delete_by_channel_id(channel_id)  # delete all tracks that belong to this channel
+        if full:
+            cls._delete_by_channel_id(channel_id)  # delete all tracks that belong to this channel
+            indexed = dict()
+        else:
+            indexed = cls._get_indexed(channel_id)  # doc id -> (digest, views, subs)
+        built_ids = set()
+        indexed_cnt = 0
         channel_raw = ChannelRaw.objects.get(_id=channel_id)  # get the channel_raw
         # parse the channel_raw and build the doc
         channel = ChannelExtractor.parse(channel_raw)
         channel_doc = cls._build_channel_doc(channel)
-        # filtering
-        vid_qset = VideoRaw.objects.filter(channel_id=channel_raw.id)
-        batches = cls._batched_queryset(vid_qset)  # to use elasticsearch-dsl's  bulk API.
-        vid_cnt = vid_qset.count()  # for progress report
-        for batch_idx, batch_qset in enumerate(batches):
-            for vid_idx, video_raw in enumerate(batch_qset):
-                # parse the video_raw and build the doc
-                video = VideoExtractor.parse(video_raw)
-                video_doc = cls._build_video_doc(video, channel_doc)
-                # extract captions from this
-                captions = CaptionExtractor.parse(video_raw)
-                general_doc_dicts = cls._build_general_doc_dicts(captions, video_doc)
-                bulk(client=es_client, actions=general_doc_dicts)
-                # log progress.
-                vid_saved = batch_idx * cls.VIDEO_BATCH_SIZE + (vid_idx + 1)
-                msg = "saved:all_tracks:video={}/{}:channel={}" \
-                    .format(vid_saved, vid_cnt, str(channel))
-                logger.info(colored(msg, 'blue'))
-
-    @classmethod
-    def exec_multi(cls):
-        """
-        build indices for all channels stored
-        :return:
+        # in the order of pk, so that the docs are indexed in the same order whatever the number of workers
+        vid_ids = list(VideoRaw.objects.filter(channel_id=channel_raw.id)
+                       .order_by('pk').values_list('_id', flat=True))
+        args_iter = (
+            (vid_id, channel_doc.to_dict(), context_builder)
+            for vid_id in vid_ids
+        )
+        refined = cls._refine_in_order(cls._refine_video, args_iter, pool,
+                                       max_in_flight=num_workers * cls.IN_FLIGHT_PER_WORKER)
+        for vid_idx, general_doc_dicts in enumerate(refined):
+            changed_doc_dicts = cls._filter_changed(general_doc_dicts, indexed, built_ids)
+            success_cnt, _ = bulk(client=es_client, actions=changed_doc_dicts)
+            indexed_cnt += success_cnt
+            # log progress.
+            msg = "saved:all_tracks:video={}/{}:channel={}" \
+                .format(vid_idx + 1, len(vid_ids), str(channel))
+            logger.info(colored(msg, 'blue'))
+        stale_ids = set(indexed.keys()) - built_ids
+        cls._delete_by_ids(stale_ids)
+        logger.info(colored("built:(indexed={}, unchanged={}, deleted={}):channel={}"
+                            .format(indexed_cnt, len(built_ids) - indexed_cnt, len(stale_ids), str(channel)), 'blue'))
+
+    @classmethod
+    def _get_pool(cls, num_workers: int) -> ContextManager[Optional[ProcessPoolExecutor]]:
+        """
+        the workers are spawned rather than forked, so that they do not share the connections of this process.
+        :return: None if num_workers is 1
         """
-        for chan_raw in ChannelRaw.objects.iterator():
-            cls.exec(chan_raw.id)
+        if num_workers <= 1:
+            return nullcontext()
+        return ProcessPoolExecutor(max_workers=num_workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=django.setup)
+
+    @classmethod
+    def _refine_in_order(cls, refine_func: Callable, args_iter: Iterable[tuple],
+                         pool: Optional[ProcessPoolExecutor], max_in_flight: int) -> Generator:
+        """
+        call refine_func on the pool, and yield the results in the order of args_iter,
+        so that the results are the same whatever the number of workers.
+        args_iter is consumed lazily; no more than max_in_flight results are waiting to be consumed at a time.
+        :param pool: if None, refine_func is called in this process.
+        """
+        if pool is None:
+            for args in args_iter:
+                yield refine_func(*args)
+            return
+        in_flight = deque()
+        for args in args_iter:
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+            in_flight.append(pool.submit(refine_func, *args))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    @classmethod
+    def _refine_video(cls, vid_id: str, channel_doc_dict: dict,
+                      context_builder: Optional[ContextBuilder]) -> List[dict]:
+        """
+        runs in a worker.
+        :return: the doc dicts of all the tracks of the video, ready to be indexed.
+        """
+        video_raw = VideoRaw.objects.get(_id=vid_id)
+        # parse the video_raw and build the doc
+        video = VideoExtractor.parse(video_raw)
+        video_doc = cls._build_video_doc(video, ChannelInnerDoc(**channel_doc_dict))
+        # extract captions from this
+        captions = CaptionExtractor.parse(video_raw)
+        return list(cls._build_general_doc_dicts(captions, video_doc, context_builder))
+
+    @classmethod
+    def _filter_changed(cls, general_doc_dicts: List[dict], indexed: Dict[str, Tuple[Optional[str], ...]],
+                        built_ids: Set[str]) -> Generator[dict, None, None]:
+        """
+        :param indexed: doc id -> (digest, views, subs) of the docs already indexed.
+        the docs that have not changed are not yielded, and the ones whose counts only have changed
+        are yielded as partial updates of the counts.
+        :param built_ids: the ids of all the docs built, yielded or not, are added to this.
+        """
+        for general_doc_dict in general_doc_dicts:
+            doc_id = general_doc_dict['_id']
+            built_ids.add(doc_id)
+            digest, views, subs = indexed.get(doc_id, (None, None, None))
+            if digest != general_doc_dict['_source']['digest']:
+                yield general_doc_dict
+                continue
+            video_dict = general_doc_dict['_source']['caption']['video']
+            if (views, subs) != (video_dict.get('views'), video_dict['channel'].get('subs')):
+                # e.g. re-scraped. the counts are not in the digest, so they are compared here
+                yield {'_op_type': "update", '_index': cls.IDX_NAME, '_id': doc_id,
+                       'doc': {'caption': {'video': {'views': video_dict.get('views'),
+                                                     'channel': {'subs': video_dict['channel'].get('subs')}}}}}
 
     @classmethod
     def _build_channel_doc(cls, channel: Channel) -> ChannelInnerDoc:
@@ -99,12 +218,13 @@ class BuildGeneralIdx:
         return caption_doc
 
     @classmethod
-    def _build_general_doc_dicts(cls, captions: List[Caption], video_doc: VideoInnerDoc) \
-            -> Generator[dict, None, None]:
+    def _build_general_doc_dicts(cls, captions: List[Caption], video_doc: VideoInnerDoc,
+                                 context_builder: Optional[ContextBuilder] = None) -> Generator[dict, None, None]:
         """
         for passing it to bulk helper
         # reference:
         # https://github.com/elastic/elasticsearch-dsl-py/issues/403#issuecomment-218447768
+        :param context_builder: builds the contexts of the tracks.
         :return:
         """
         logger = logging.getLogger("_build_general_doc_dicts")
@@ -119,41 +239,61 @@ class BuildGeneralIdx:
                 logger.warning("SKIP:tracks_raw does not exist for:caption_id=" + caption.id)
                 continue
             else:
-                # parse it to get all tracks
-                tracks = TrackExtractor.parse(tracks_raw)
+                # parse it to get all tracks, column by column
+                batch = TrackExtractor.parse_batch(tracks_raw, context_builder)
+                track_ids = batch.get_ids()
+                prev_ids, next_ids = batch.get_neighbour_ids(track_ids)
+                contexts = batch.get_contexts()
                 # send all the tracks in the captions to the generator
-                for track in tracks:
-                    general_doc = GeneralDoc(meta={'id': track.id},  # this is how you put the id
-                                             start=track.start, duration=track.duration,
-                                             content=track.content, prev_id=track.prev_id,
-                                             next_id=track.next_id, context=track.context,
+                for track_id, start, duration, content, prev_id, next_id, context in zip(
+                        track_ids, batch.starts.tolist(), batch.durations.tolist(), batch.contents,
+                        prev_ids, next_ids, contexts):
+                    general_doc = GeneralDoc(meta={'id': track_id},  # this is how you put the id
+                                             start=start, duration=duration,
+                                             content=content, prev_id=prev_id,
+                                             next_id=next_id, context=context,
                                              caption=caption_doc)
+                    general_doc.digest = cls._get_doc_digest(general_doc)
                     # turn them into dicts to be passed to bulk helper
                     general_doc_dict = general_doc.to_dict(include_meta=True)
                     # and yield
                     yield general_doc_dict
 
     @classmethod
-    def _batched_queryset(cls, queryset):
+    def _get_doc_digest(cls, general_doc: GeneralDoc) -> str:
         """
-        Slice a queryset into chunks.
-        Code excerpted from: https://djangosnippets.org/snippets/10599/
+        the counts are left out, as they are updated in place, by _filter_changed or RefreshGeneralIdxMetadata.
         """
-        start_pk = 0
-        queryset = queryset.order_by('pk')
-        while True:
-            # No entry left
-            if not queryset.filter(pk__gt=start_pk).exists():
-                break
-            try:
-                # Fetch chunk_size entries if possible
-                end_pk = queryset.filter(pk__gt=start_pk).values_list(
-                    'pk', flat=True)[cls.VIDEO_BATCH_SIZE - 1]
-                # Fetch rest entries if less than chunk_size left
-            except IndexError:
-                end_pk = queryset.values_list('pk', flat=True).last()
-            yield queryset.filter(pk__gt=start_pk).filter(pk__lte=end_pk)
-            start_pk = end_pk
+        doc_dict = general_doc.to_dict()
+        doc_dict.pop('digest', None)
+        video_dict = doc_dict['caption']['video']
+        video_dict.pop('views', None)
+        video_dict['channel'].pop('subs', None)
+        doc_json = json.dumps(doc_dict, sort_keys=True)
+        return hashlib.blake2b(doc_json.encode("utf-8"), digest_size=cls.DIGEST_SIZE).hexdigest()
+
+    @classmethod
+    def _get_indexed(cls, channel_id: str) -> Dict[str, Tuple[Optional[str], Optional[int], Optional[int]]]:
+        """
+        :return: doc id -> (digest, views, subs), of all the docs of the channel. the digest is None for the docs
+        indexed before the digests were.
+        """
+        s: Search = Search(using=es_client, index=cls.IDX_NAME) \
+            .filter("term", **{"caption.video.channel.id": channel_id}) \
+            .source(['digest', 'caption.video.views', 'caption.video.channel.subs'])
+        indexed = dict()
+        for hit in s.scan():
+            video_dict = hit.to_dict().get('caption', dict()).get('video', dict())
+            indexed[hit.meta.id] = (getattr(hit, 'digest', None), video_dict.get('views'),
+                                    video_dict.get('channel', dict()).get('subs'))
+        return indexed
+
+    @classmethod
+    def _delete_by_ids(cls, doc_ids: Iterable[str]):
+        bulk(client=es_client, actions=(
+            {'_op_type': "delete", '_index': cls.IDX_NAME, '_id': doc_id}
+            for doc_id in doc_ids
+        ))
 
     @classmethod
     def _delete_by_channel_id(cls, channel_id: str) -> dict:
@@ -163,6 +303,114 @@ class BuildGeneralIdx:
         return resp.to_dict()
 
 
+class RefreshGeneralIdxMetadata:
+    """
+    re-fetches the subscriber counts of the stored channels and the view counts of their stored videos,
+    and pushes them to general_idx as partial updates of the documents that embed them.
+    no caption is touched, and no general doc is rebuilt.
+    the fresh counts are stored in the channel & video raws as well, so that the next build picks them up.
+    """
+    IDX_NAME = GeneralDoc.Index.name
+    # the counts are tiny, so many of them can be fetched at a time
+    MAX_IN_FLIGHT = 32
+    # the number of channels / videos to update with a single update_by_query call
+    UPDATE_BATCH_SIZE = 500
+    SUBS_SCRIPT = "ctx._source.caption.video.channel.subs = params.counts[ctx._source.caption.video.channel.id]"
+    VIEWS_SCRIPT = "ctx._source.caption.video.views = params.counts[ctx._source.caption.video.id]"
+
+    @classmethod
+    def exec(cls, channel_id: Optional[str] = None, max_in_flight: int = MAX_IN_FLIGHT):
+        """
+        :param channel_id: refresh this channel and its videos only. if not given, all channels are refreshed.
+        :param max_in_flight: the maximum number of counts to fetch at a time.
+        """
+        if channel_id:
+            chan_ids = [channel_id]
+            vid_qset = VideoRaw.objects.filter(channel_id=channel_id)
+        else:
+            chan_ids = list(ChannelRaw.objects.values_list('_id', flat=True))
+            vid_qset = VideoRaw.objects.all()
+        vid_ids = list(vid_qset.values_list('_id', flat=True))
+        for subs in cls._fetch_counts(ChannelRawScraper.scrape_subs, chan_ids, max_in_flight):
+            cls._update_by_query("caption.video.channel.id", cls.SUBS_SCRIPT, subs)
+            cls._store_subs(subs)
+        for views in cls._fetch_counts(VideoRawScraper.scrape_views, vid_ids, max_in_flight):
+            cls._update_by_query("caption.video.id", cls.VIEWS_SCRIPT, views)
+            cls._store_views(views)
+
+    @classmethod
+    def _fetch_counts(cls, scrape_func: Callable[[str], Optional[int]], ids: List[str],
+                      max_in_flight: int) -> Generator[Dict[str, int], None, None]:
+        """
+        fetch the counts concurrently, and yield them in batches of UPDATE_BATCH_SIZE.
+        the ones that failed to be fetched are skipped.
+        """
+        logger = logging.getLogger("_fetch_counts")
+        counts = dict()
+        done = 0
+        args_iter = ((id_,) for id_ in ids)
+        for args, future in Scraper._scrape_bounded(scrape_func, args_iter, max_in_flight):
+            done += 1
+            try:
+                count = future.result()
+            except (requests.exceptions.RequestException, youtube_dl.utils.DownloadError, ChannelInfoNotFoundError,
+                    # the page was fetched, but could not be parsed (ValueError includes JSONDecodeError)
+                    KeyError, ValueError, AttributeError, IndexError) as e:
+                logger.warning("SKIP:{}:{}:{}".format(args[0], type(e).__name__, e))
+                continue
+            if count is not None:
+                counts[args[0]] = count
+            if len(counts) >= cls.UPDATE_BATCH_SIZE:
+                logger.info("{}:{}/{}".format(scrape_func.__name__, done, len(ids)))
+                yield counts
+                counts = dict()
+        if counts:
+            logger.info("{}:{}/{}".format(scrape_func.__name__, done, len(ids)))
+            yield counts
+
+    @classmethod
+    def _update_by_query(cls, id_field: str, script: str, counts: Dict[str, int]) -> dict:
+        """
+        update, in place, the count embedded in all the docs whose id_field is one of the keys of counts.
+        """
+        logger = logging.getLogger("_update_by_query")
+        ubq: UpdateByQuery = UpdateByQuery(using=es_client, index=cls.IDX_NAME) \
+            .filter("terms", **{id_field: list(counts.keys())}) \
+            .script(source=script, lang="painless", params={'counts': counts}) \
+            .params(conflicts="proceed")
+        resp = ubq.execute().to_dict()
+        logger.info(colored("updated:{}:(ids={}, docs={})".format(id_field, len(counts), resp.get('updated')),
+                            'blue'))
+        return resp
+
+    @classmethod
+    def _store_subs(cls, subs: Dict[str, int]):
+        """
+        the subscriber count of a channel raw is in its main html, so the count is replaced in there.
+        """
+        logger = logging.getLogger("_store_subs")
+        main_html_field = ChannelRaw._meta.get_field('main_html')
+        collection = BulkRawWriter.get_collection(ChannelRaw)
+        updates = list()
+        for doc in collection.find({'_id': {'$in': list(subs.keys())}}, {main_html_field.column: 1}):
+            main_html = ChannelRawScraper._sub_subs(main_html_field.to_python(doc[main_html_field.column]),
+                                                    subs[doc['_id']])
+            if main_html is None:
+                logger.warning("SKIP: subscriber count not found:" + doc['_id'])
+                continue
+            updates.append(UpdateOne({'_id': doc['_id']},
+                                       {'$set': {main_html_field.column: main_html_field.compress(main_html)}}))
+        if updates:
+            collection.bulk_write(updates, ordered=False)
+
+    @classmethod
+    def _store_views(cls, views: Dict[str, int]):
+        BulkRawWriter.get_collection(VideoRaw).bulk_write([
+            UpdateOne({'_id': vid_id}, {'$set': {'video_info.view_count': view_count}})
+            for vid_id, view_count in views.items()
+        ], ordered=False)
+
+
 # for opensub
 class BuildOpenSubIdx:
     # to be used for es_client.
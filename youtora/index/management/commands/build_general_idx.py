@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from youtora.index.facades import BuildGeneralIdx
+from youtora.refine.contexts import ContextBuilder
 
 
 class Command(BaseCommand):
@@ -10,11 +11,25 @@ class Command(BaseCommand):
         parser.add_argument('-c', '--channel_id', type=str,
                             help="the id of the channel to build documents for."
                                  "if this is not given, all channels will be indexed.")
+        parser.add_argument('--full', action='store_true',
+                            help="delete the documents of the channels and index them all again,"
+                                 " instead of indexing the ones that have changed only."
+                                 " the docs whose view or subscriber counts only have changed are updated in place.")
+        parser.add_argument('--context_tracks', type=int, default=ContextBuilder.NUM_TRACKS,
+                            help="the context of a track is this many tracks on each side of it")
+        parser.add_argument('--context_secs', type=float,
+                            help="the context of a track is the tracks that start within this many seconds of it."
+                                 " overrides --context_tracks")
+        parser.add_argument('--num_workers', type=int, default=BuildGeneralIdx.NUM_WORKERS,
+                            help="the number of processes to parse the raws with, while indexing in this one")
 
     def handle(self, *args, **options):
         # build the general doc
         channel_id = options['channel_id']
+        context_builder = ContextBuilder(num_tracks=options['context_tracks'], secs=options['context_secs'])
         if not channel_id:
-            BuildGeneralIdx.exec_multi()
+            BuildGeneralIdx.exec_multi(full=options['full'], context_builder=context_builder,
+                                       num_workers=options['num_workers'])
         else:
-            BuildGeneralIdx.exec(channel_id)
+            BuildGeneralIdx.exec(channel_id, full=options['full'], context_builder=context_builder,
+                                 num_workers=options['num_workers'])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from youtora.index.facades import RefreshGeneralIdxMetadata
+
+
+class Command(BaseCommand):
+    HELP = 'refresh the view & subscriber counts in general_idx, without rebuilding it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-c', '--channel_id', type=str,
+                            help="the id of the channel to refresh."
+                                 "if this is not given, all channels will be refreshed.")
+        parser.add_argument('--max_in_flight', type=int, default=RefreshGeneralIdxMetadata.MAX_IN_FLIGHT,
+                            help="the maximum number of counts to fetch at a time")
+
+    def handle(self, *args, **options):
+        RefreshGeneralIdxMetadata.exec(options['channel_id'], options['max_in_flight'])
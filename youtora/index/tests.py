@@ -1,3 +1,81 @@
-from django.test import TestCase
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from pymongo import UpdateOne
+
+from youtora.collect.fields import CompressedTextField
+from youtora.collect.models import ChannelRaw
+from youtora.collect.writers import BulkRawWriter
+from youtora.index.facades import BuildGeneralIdx, RefreshGeneralIdxMetadata
+from youtora.refine.errors import ChannelInfoNotFoundError
+from youtora.refine.extractors import ChannelExtractor
+
+
+def refine_slowly(idx: int) -> int:
+    # the earlier ones finish later
+    time.sleep(0.02 * (5 - idx % 5))
+    return idx
+
+
+def fetch_count(id_: str) -> int:
+    if id_ == "parse_error":
+        raise KeyError('viewCount')
+    if id_ == "no_subs":
+        raise ChannelInfoNotFoundError("subscriber count not found:" + id_)
+    return len(id_)
+
+
+class RefreshGeneralIdxMetadataTestCase(TestCase):
+
+    def test_fetch_counts_skips_failed_ids(self):
+        ids = ["a", "parse_error", "bb", "no_subs", "ccc"]
+        batches = list(RefreshGeneralIdxMetadata._fetch_counts(fetch_count, ids, max_in_flight=2))
+        counts = {id_: count for batch in batches for id_, count in batch.items()}
+        self.assertEqual({'a': 1, 'bb': 2, 'ccc': 3}, counts)
+
+    def test_refreshed_subs_are_rebuilt(self):
+        main_html = "<title>Abdul Bari</title>\n" \
+                    "<span class=\"c4-tabbed-header-subscriber-count\">285K subscribers</span>"
+        refreshed_html = main_html.replace("285K", "301234")
+        collection = MagicMock()
+        collection.find.return_value = [{'_id': "c", 'main_html': CompressedTextField.compress(main_html)}]
+        with patch.object(BulkRawWriter, 'get_collection', return_value=collection):
+            RefreshGeneralIdxMetadata._store_subs({'c': 301234})
+        collection.bulk_write.assert_called_once_with(
+            [UpdateOne({'_id': "c"}, {'$set': {'main_html': CompressedTextField.compress(refreshed_html)}})],
+            ordered=False)
+        # the next build reads the refreshed count
+        channel_raw = ChannelRaw(_id="c", url="https://www.youtube.com/channel/c", lang_code="en",
+                                 main_html=refreshed_html, uploads_html="")
+        self.assertEqual(301234, ChannelExtractor.parse(channel_raw).subs)
+
+
+class BuildGeneralIdxTestCase(TestCase):
+
+    def test_refine_in_order_without_pool(self):
+        args_iter = ((idx,) for idx in range(10))
+        self.assertEqual(list(range(10)),
+                         list(BuildGeneralIdx._refine_in_order(refine_slowly, args_iter, None, max_in_flight=1)))
+
+    def test_refine_in_order_with_pool(self):
+        args_iter = ((idx,) for idx in range(10))
+        with BuildGeneralIdx._get_pool(num_workers=3) as pool:
+            refined = list(BuildGeneralIdx._refine_in_order(refine_slowly, args_iter, pool, max_in_flight=6))
+        self.assertEqual(list(range(10)), refined)
+
+    def test_filter_changed(self):
+        general_doc_dicts = [
+            {'_id': doc_id, '_source': {'digest': digest,
+                                        'caption': {'video': {'views': 10, 'channel': {'subs': 100}}}}}
+            for doc_id, digest in [("a", "1"), ("b", "2"), ("c", "3"), ("e", "5")]
+        ]
+        indexed = {'a': ("1", 10, 100), 'b': ("0", 10, 100), 'd': ("4", 10, 100), 'e': ("5", 9, 100)}
+        built_ids = set()
+        changed = list(BuildGeneralIdx._filter_changed(general_doc_dicts, indexed, built_ids))
+        self.assertEqual(["b", "c", "e"], [general_doc_dict['_id'] for general_doc_dict in changed])
+        self.assertEqual(general_doc_dicts[1:3], changed[:2])
+        # the counts only have changed
+        self.assertEqual("update", changed[2]['_op_type'])
+        self.assertEqual({'caption': {'video': {'views': 10, 'channel': {'subs': 100}}}}, changed[2]['doc'])
+        self.assertEqual({"a", "b", "c", "e"}, built_ids)
@@ -0,0 +1,69 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from youtora.refine.dataclasses import TrackBatch
+
+
+class ContextBuilder:
+    """
+    builds the contexts of all the tracks of a batch in a single pass, with either of the two windows:
+    - tracks: the num_tracks tracks on each side of a track, and the track itself.
+    - secs: the tracks that start within secs seconds of the start of a track, in the order of their starts.
+    the contents are joined into one buffer, and the context of a track is the slice of the buffer from
+    the start of the first track in its window to the end of the last one. so the cost of building the contexts
+    does not grow with the size of the window, and the contexts are only sliced out when they are read.
+    """
+    NUM_TRACKS = 1
+    SEP = " "
+
+    def __init__(self, num_tracks: int = NUM_TRACKS, secs: Optional[float] = None):
+        """
+        :param num_tracks: the number of tracks on each side. ignored if secs is given.
+        :param secs: the seconds on each side.
+        """
+        if num_tracks < 0 or (secs is not None and secs < 0):
+            raise ValueError("the window must not be negative:(num_tracks={}, secs={})".format(num_tracks, secs))
+        self.num_tracks = num_tracks
+        self.secs = secs
+
+    def build(self, batch: TrackBatch):
+        """
+        sets the contexts of the batch.
+        """
+        if not len(batch):
+            return
+        order = self._get_order(batch)
+        # the contents in the order they are joined. the contexts are contiguous slices of the buffer
+        contents = batch.contents if order is None else [batch.contents[idx] for idx in order.tolist()]
+        lo_pos, hi_pos = self._get_windows(batch, order)
+        lengths = np.fromiter((len(content) for content in contents), dtype=np.int64, count=len(contents))
+        # the offsets of the contents in the buffer. each is followed by a separator
+        char_starts = np.zeros(len(contents), dtype=np.int64)
+        np.cumsum(lengths[:-1] + len(self.SEP), out=char_starts[1:])
+        batch.context_buffer = self.SEP.join(contents)
+        batch.context_starts = char_starts[lo_pos]
+        batch.context_ends = (char_starts + lengths)[hi_pos]
+
+    def _get_order(self, batch: TrackBatch) -> Optional[np.ndarray]:
+        """
+        the tracks are joined in the order of their starts in the secs window, so that the tracks
+        within secs of each other are next to each other in the buffer, even if the caption is out of order.
+        :return: the indices of the tracks in the order to join them. None if that is the order of the batch.
+        """
+        if self.secs is None or np.all(np.diff(batch.starts) >= 0):
+            return None
+        return np.argsort(batch.starts, kind='stable')
+
+    def _get_windows(self, batch: TrackBatch, order: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param order: see _get_order
+        :return: the positions, in the buffer, of the first & last tracks in the window of each track.
+        """
+        if self.secs is not None:
+            sorted_starts = batch.starts if order is None else batch.starts[order]
+            lo_pos = np.searchsorted(sorted_starts, batch.starts - self.secs, side='left')
+            hi_pos = np.searchsorted(sorted_starts, batch.starts + self.secs, side='right') - 1
+            return lo_pos, hi_pos
+        indices = np.arange(len(batch), dtype=np.int64)
+        return np.maximum(indices - self.num_tracks, 0), np.minimum(indices + self.num_tracks, len(batch) - 1)
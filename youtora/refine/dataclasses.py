@@ -1,5 +1,8 @@
+import hashlib
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
 
 
 # --- YouTube --- #
@@ -33,17 +36,32 @@ class Track:
     next_id: str = None
     context: str = None
     timed_url: str = None
+    # the size of the digest of a track, in bytes
+    DIGEST_SIZE = 8
 
     @property
     def id(self) -> str:
         """
-        combine with the hash value of the track to get the id.
-        :return: the id of this track.
+        combine with the digest of the track to get the id.
+        :return: the id of this track. the same across runs and processes.
+        """
+        return self.get_id(self.caption_id, self.get_digest(self.caption_id, self.start, self.content))
+
+    @classmethod
+    def get_digest(cls, caption_id: str, start: float, content: str) -> int:
+        """
+        blake2b of the caption_id, start and content. unlike hash(), it is not salted per process,
+        so that a track is indexed under the same id every time.
         """
-        return "|".join([self.caption_id, str(self.__hash__())])
+        key = "|".join([caption_id, repr(start), content])
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=cls.DIGEST_SIZE).digest(), "big")
+
+    @classmethod
+    def get_id(cls, caption_id: str, digest: int) -> str:
+        return "|".join([caption_id, format(digest, "0{}x".format(cls.DIGEST_SIZE * 2))])
 
     def __hash__(self) -> int:
-        return hash((self.caption_id, self.start, self.content))
+        return self.get_digest(self.caption_id, self.start, self.content)
 
     # overrides dunder string method
     def __str__(self) -> str:
@@ -66,6 +84,92 @@ class Track:
         }
 
 
+@dataclass(eq=False)  # the arrays are not comparable with ==
+class TrackBatch:
+    """
+    the tracks of a caption, column by column. a caption can have thousands of tracks, so rather than
+    a Track per track, the numbers are kept in arrays and the neighbours as indices.
+    Track views are built only when asked for.
+    """
+    caption_id: str
+    starts: np.ndarray  # float64
+    durations: np.ndarray  # float64
+    contents: List[str]
+    digests: np.ndarray  # uint64. see Track.get_digest
+    # the indices of the previous & next tracks. -1 if there is none.
+    prev_idx: np.ndarray  # int64
+    next_idx: np.ndarray  # int64
+    # the context of a track is context_buffer[context_starts[idx]:context_ends[idx]]. see ContextBuilder
+    context_buffer: Optional[str] = None
+    context_starts: Optional[np.ndarray] = None  # int64
+    context_ends: Optional[np.ndarray] = None  # int64
+
+    @classmethod
+    def build(cls, caption_id: str, starts: List[float], durations: List[float], contents: List[str]) \
+            -> 'TrackBatch':
+        """
+        :return: a batch with no neighbours and no contexts set.
+        """
+        no_neighbours = np.full(len(starts), -1, dtype=np.int64)
+        return TrackBatch(caption_id=caption_id,
+                          starts=np.array(starts, dtype=np.float64),
+                          durations=np.array(durations, dtype=np.float64),
+                          contents=contents,
+                          # hashed while the starts are floats, not numpy scalars, so that the ids match Track.id
+                          digests=np.array([
+                              Track.get_digest(caption_id, start, content)
+                              for start, content in zip(starts, contents)
+                          ], dtype=np.uint64),
+                          prev_idx=no_neighbours,
+                          next_idx=no_neighbours.copy())
+
+    def get_ids(self) -> List[str]:
+        return [
+            Track.get_id(self.caption_id, digest)
+            for digest in self.digests.tolist()
+        ]
+
+    def get_neighbour_ids(self, ids: Optional[List[str]] = None) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """
+        :param ids: the ids of the tracks, if already built.
+        :return: the prev_ids & next_ids of the tracks
+        """
+        ids = ids if ids is not None else self.get_ids()
+        prev_ids = [ids[idx] if idx >= 0 else None for idx in self.prev_idx.tolist()]
+        next_ids = [ids[idx] if idx >= 0 else None for idx in self.next_idx.tolist()]
+        return prev_ids, next_ids
+
+    def get_context(self, idx: int) -> Optional[str]:
+        if self.context_buffer is None:
+            return None
+        return self.context_buffer[self.context_starts[idx]:self.context_ends[idx]]
+
+    def get_contexts(self) -> List[Optional[str]]:
+        if self.context_buffer is None:
+            return [None] * len(self)
+        return [
+            self.context_buffer[start:end]
+            for start, end in zip(self.context_starts.tolist(), self.context_ends.tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, idx: int) -> Track:
+        prev_idx, next_idx = int(self.prev_idx[idx]), int(self.next_idx[idx])
+        return Track(caption_id=self.caption_id,
+                     start=float(self.starts[idx]),
+                     duration=float(self.durations[idx]),
+                     content=self.contents[idx],
+                     prev_id=Track.get_id(self.caption_id, int(self.digests[prev_idx])) if prev_idx >= 0 else None,
+                     next_id=Track.get_id(self.caption_id, int(self.digests[next_idx])) if next_idx >= 0 else None,
+                     context=self.get_context(idx))
+
+    def __iter__(self) -> Iterator[Track]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+
 @dataclass
 class Caption:
     id: str
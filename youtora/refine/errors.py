@@ -4,3 +4,10 @@ class CaptionNotFoundError(Exception):
     an Exception to be raised when the desired caption was not found
     """
     pass
+
+
+class ChannelInfoNotFoundError(Exception):
+    """
+    an Exception to be raised when the title or the subscriber count of a channel was not found in its page
+    """
+    pass
@@ -1,12 +1,13 @@
 # import all the models needed
 import html
+import io
 import logging
 import re
-from typing import List, Generator, Collection
+from typing import List, Generator, Collection, Optional, Union
 
-import xmltodict
-# for parsing
-from bs4 import BeautifulSoup
+import lxml.html
+import numpy as np
+from lxml import etree
 
 from youtora.collect.models import (
     ChannelRaw,
@@ -17,9 +18,11 @@ from youtora.refine.dataclasses import (
     Channel,
     Video,
     Track,
+    TrackBatch,
     Caption, Response
 )
-from youtora.refine.errors import CaptionNotFoundError
+from youtora.refine.contexts import ContextBuilder
+from youtora.refine.errors import CaptionNotFoundError, ChannelInfoNotFoundError
 
 
 class ChannelExtractor:
@@ -28,11 +31,17 @@ class ChannelExtractor:
     SUB_CNT_CLASS = "c4-tabbed-header-subscriber-count"  # get rid of th empty space
     UPLOADED_THUMB_CLASS = "compact-media-item-image"
 
+    # the xpaths of the elements, matching a class the same way BeautifulSoup does (i.e. any of the classes)
+    SUB_CNT_XPATH = "//span[contains(concat(' ', normalize-space(@class), ' '), ' {} ')]".format(SUB_CNT_CLASS)
+    UPLOADED_THUMB_XPATH = "//a[contains(concat(' ', normalize-space(@class), ' '), ' {} ')]/@href" \
+        .format(UPLOADED_THUMB_CLASS)
+
     @classmethod
     def parse(cls, channel_raw: ChannelRaw) -> Channel:
-        # parse the main html's to get the title and subs.
-        title = cls._ext_title(channel_raw.main_html)
-        subs = cls._ext_subs(channel_raw.main_html)
+        # parse the main html once, to get the title and subs.
+        main_tree = cls._parse_html(channel_raw.main_html)
+        title = cls._ext_title(main_tree)
+        subs = cls._ext_subs(main_tree, channel_raw.id)
         # parse uploads html to get the list of all uploaded videos
         vid_id_list = cls._ext_video_id_list(channel_raw.uploads_html)
         # the channel_id is given a lang code
@@ -44,28 +53,42 @@ class ChannelExtractor:
                        vid_id_list=vid_id_list)
 
     @classmethod
-    def _ext_title(cls, main_html: str) -> str:
+    def _parse_html(cls, html_str: str) -> lxml.html.HtmlElement:
+        """
+        lxml is an order of magnitude faster than html.parser.
+        """
+        return lxml.html.document_fromstring(html_str)
+
+    @classmethod
+    def _ext_title(cls, main_html: Union[str, lxml.html.HtmlElement]) -> str:
         """
         e.g.
         <title>Abdul Bari - YouTube</title>
+        :param main_html: the html, or its parsed tree
         """
-        soup = BeautifulSoup(main_html, 'html.parser')
-        title_elem = soup.find('title')
-        return title_elem.text.split("-")[0].strip()
+        main_tree = cls._parse_html(main_html) if isinstance(main_html, str) else main_html
+        title_elem = main_tree.find('.//title')
+        return title_elem.text_content().split("-")[0].strip()
 
     @classmethod
-    def _ext_subs(cls, main_html: str) -> int:
+    def _ext_subs(cls, main_html: Union[str, lxml.html.HtmlElement], channel_id: str = None) -> int:
         """
         keep in mind that the subs count is
         only a rough value.
         e.g.
         <span class="c4-tabbed-header-subscriber-count secondary-text">285K subscribers</span>
+        :param main_html: the html, or its parsed tree
+        :param channel_id: for the error message
         :return: the approximate sub count of the channel_id
+        :raises ChannelInfoNotFoundError: if the html has no subscriber count.
         """
-        soup = BeautifulSoup(main_html, 'html.parser')
-        span_elem = soup.find('span', attrs={'class': cls.SUB_CNT_CLASS})
+        main_tree = cls._parse_html(main_html) if isinstance(main_html, str) else main_html
+        span_elems = main_tree.xpath(cls.SUB_CNT_XPATH)
+        if not span_elems:
+            raise ChannelInfoNotFoundError("subscriber count not found:{}".format(channel_id))
+        span_elem = span_elems[0]
         # get the data
-        span_data = span_elem.text.split(" ")[0].strip()
+        span_data = span_elem.text_content().split(" ")[0].strip()
         # Now I have to parse this
         if re.match(r'[\d.]*[KMB]$', span_data):
             if span_data[-1] == 'K':
@@ -83,20 +106,13 @@ class ChannelExtractor:
 
     @classmethod
     def _ext_video_id_list(cls, uploads_html: str) -> List[str]:
-        # get all the elements that are of this class
-        soup = BeautifulSoup(uploads_html, 'html.parser')
-        video_id_list = list()
-        # is this div tag?
-        uploaded_thumbs = soup.find_all('a', attrs={'class': cls.UPLOADED_THUMB_CLASS})
-        for thumb in uploaded_thumbs:
-            # get the href attribute,
-            thumb_url = thumb['href']
-            video_id = thumb_url.split("=")[-1].strip()
-            video_id_list.append(video_id)
-        # now get the boxes.
-        # when everything is done
-        # collect the video ids.
-        return video_id_list
+        if not uploads_html.strip():
+            return list()
+        # the href attributes of all the thumbnail anchors, e.g. /watch?v=0IAPZzGSbME
+        return [
+            str(thumb_url).split("=")[-1].strip()
+            for thumb_url in cls._parse_html(uploads_html).xpath(cls.UPLOADED_THUMB_XPATH)
+        ]
 
 
 class CaptionExtractor:
@@ -192,81 +208,81 @@ class CaptionExtractor:
 
 
 class TrackExtractor:
+    # the previous, the current and the next track
+    CONTEXT_BUILDER = ContextBuilder(num_tracks=1)
+
     @classmethod
     def parse(cls, tracks_raw: TracksRaw) -> List[Track]:
-        logger = logging.getLogger("parse")
+        return list(cls.parse_batch(tracks_raw))
+
+    @classmethod
+    def parse_batch(cls, tracks_raw: TracksRaw, context_builder: Optional[ContextBuilder] = None) -> TrackBatch:
+        """
+        :param context_builder: builds the contexts of the tracks. CONTEXT_BUILDER if not given.
+        """
+        logger = logging.getLogger("parse_batch")
+        starts = list()
+        durations = list()
+        contents = list()
         if not tracks_raw.raw_xml:
-            # return an empty list if raw_xml is None
-            return list()
-        tracks = list()
-        tracks_caption_id = tracks_raw.caption_id
-        tracks_xml = html.unescape(tracks_raw.raw_xml)  # get the tracks_html. escape the character reference entities
-        tracks_dict = xmltodict.parse(tracks_xml)  # deserialize the raw_xml to dict
-        # if not a  list, ignore. quirk of youtube_dl - if there is only one track,
-        # then the value of text is a dict, not a list.
+            # return an empty batch if raw_xml is None
+            return TrackBatch.build(tracks_raw.caption_id, starts, durations, contents)
+        text_cnt = 0
+        # stream the <text start dur> elements, rather than building the whole transcript in memory
+        text_elems = etree.iterparse(io.BytesIO(tracks_raw.raw_xml.encode("utf-8")), events=('end',), tag='text')
+        for _, text_elem in text_elems:
+            text_cnt += 1
+            start = text_elem.get('start')
+            duration = text_elem.get('dur')
+            content = (text_elem.text or "").strip()
+            if "&" in content:
+                # the entities are escaped twice; the xml ones are unescaped by the parser, the html ones here.
+                content = html.unescape(content).strip()
+            if "<" in content:
+                # the styled tracks are wrapped in markup, e.g. <font color="#E5E5E5">. keep the text only
+                content = cls._strip_tags(content)
+            # free the element, and the ones before it
+            text_elem.clear()
+            while text_elem.getprevious() is not None:
+                del text_elem.getparent()[0]
+            if start is None or duration is None or not content:
+                # if either one of them does not exist,then just skip this track
+                # as it is not worthy of storing
+                logger.warning("SKIP: track does not have:start, dur or content")
+                continue
+            # collect the track, column by column
+            starts.append(float(start))
+            durations.append(float(duration))
+            contents.append(content)
+        # a transcript of a single track has always been ignored (xmltodict parsed it into a dict, not a list).
         # e.g. https://www.youtube.com/watch?v=1SMmc9gQmHQ
-        if isinstance(tracks_dict['transcript']['text'], list):
-            for trackItem in tracks_dict['transcript']['text']:
-                try:
-                    start: float = float(trackItem["@start"])
-                    duration: float = float(trackItem["@dur"])
-                    content = trackItem["#text"]
-                except KeyError as ke:
-                    # if either one of them does not exist,then just skip this track
-                    # as it is not worthy of storing
-                    logger.warning("SKIP: track does not have:" + str(ke))
-                    continue
-                else:
-                    # build track and collect
-                    track = Track(caption_id=tracks_caption_id,
-                                  start=start,
-                                  duration=duration,
-                                  content=content)
-                    tracks.append(track)
+        if text_cnt == 1:
+            return TrackBatch.build(tracks_raw.caption_id, list(), list(), list())
+        batch = TrackBatch.build(tracks_raw.caption_id, starts, durations, contents)
         # if there are more than one tracks, set neighbours and contexts
-        if len(tracks) > 1:
-            cls._set_neighbours(tracks)
-            cls._set_contexts(tracks)
-        return tracks
+        if len(batch) > 1:
+            cls._set_neighbours(batch)
+            (context_builder or cls.CONTEXT_BUILDER).build(batch)
+        return batch
 
     @classmethod
-    def _set_neighbours(cls, tracks: List[Track]):
-        """
-        sets the prev_id & next_id of all the tracks in the list
-        """
-        for idx, track in enumerate(tracks):
-            if idx == 0:
-                # the first track has no prev_id; it only has next_id
-                prev_id = None
-                next_id = tracks[idx + 1].id
-            elif idx == (len(tracks) - 1):
-                # the last track has no next_id; it only has prev_id
-                prev_id = tracks[idx - 1].id
-                next_id = None
-            else:
-                # middle tracks have both prev_id and next_id
-                prev_id = tracks[idx - 1].id
-                next_id = tracks[idx + 1].id
-            # set prev & next
-            track.prev_id = prev_id
-            track.next_id = next_id
+    def _strip_tags(cls, content: str) -> str:
+        try:
+            return lxml.html.fromstring(content).text_content().strip()
+        except etree.ParserError:
+            # nothing but markup, e.g. a comment
+            return ""
 
     @classmethod
-    def _set_contexts(cls, tracks: List[Track]):
-        for idx, track in enumerate(tracks):
-            # get the current id
-            curr_content = track.content
-            if idx == 0:
-                prev_content = ""
-                next_content = tracks[idx + 1].content
-            elif idx == (len(tracks) - 1):
-                prev_content = tracks[idx - 1].content
-                next_content = ""
-            else:
-                prev_content = tracks[idx - 1].content
-                next_content = tracks[idx + 1].content
-            # set the context
-            track.context = " ".join([prev_content, curr_content, next_content])
+    def _set_neighbours(cls, batch: TrackBatch):
+        """
+        sets the indices of the prev & next tracks of all the tracks in the batch.
+        the first track has no prev track, and the last track has no next track.
+        """
+        indices = np.arange(len(batch), dtype=np.int64)
+        batch.prev_idx = indices - 1
+        batch.next_idx = indices + 1
+        batch.next_idx[-1] = -1
 
 
 class VideoExtractor:
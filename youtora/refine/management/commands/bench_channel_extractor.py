@@ -0,0 +1,58 @@
+import timeit
+from os import path
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+
+from youtora.collect.models import ChannelRaw
+from youtora.refine.extractors import ChannelExtractor
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "..", "..", "tests", "fixtures")
+
+
+class Command(BaseCommand):
+    HELP = 'benchmark ChannelExtractor.parse on recorded pages, before & after parsing with lxml'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--number', type=int, default=20,
+                            help="the number of times to parse the channel")
+        parser.add_argument('--scale', type=int, default=10,
+                            help="repeat the recorded uploads this many times, to simulate a large channel")
+
+    def handle(self, *args, **options):
+        number = options['number']
+        with open(path.join(FIXTURES_DIR, "channel_main_rendered.html"), 'r') as fh:
+            main_html = fh.read()
+        with open(path.join(FIXTURES_DIR, "channel_uploads_rendered.html"), 'r') as fh:
+            uploads_html = fh.read()
+        head, body = uploads_html.split("<body>")
+        uploads_html = head + "<body>" + body * options['scale']
+        channel_raw = ChannelRaw(_id="UCZCFT11CWBi3MHNlGf019nw", main_html=main_html, uploads_html=uploads_html)
+        channel = ChannelExtractor.parse(channel_raw)
+        assert self._parse_with_html_parser(channel_raw) == (channel.title, channel.subs, channel.vid_id_list)
+        # before: three html.parser trees
+        before = timeit.timeit(lambda: self._parse_with_html_parser(channel_raw), number=number) / number
+        # after: lxml, and the main html parsed once
+        after = timeit.timeit(lambda: ChannelExtractor.parse(channel_raw), number=number) / number
+        self.stdout.write("ChannelExtractor.parse (main={}KB, uploads={}KB, n={}):"
+                          .format(len(main_html) // 1000, len(uploads_html) // 1000, number))
+        self.stdout.write("before: {:.2f}ms".format(before * 1000))
+        self.stdout.write("after: {:.2f}ms".format(after * 1000))
+
+    @staticmethod
+    def _parse_with_html_parser(channel_raw: ChannelRaw) -> tuple:
+        """
+        the extraction as it was done with BeautifulSoup.
+        :return: title, subs, vid_id_list
+        """
+        title = BeautifulSoup(channel_raw.main_html, 'html.parser').find('title').text.split("-")[0].strip()
+        span_elem = BeautifulSoup(channel_raw.main_html, 'html.parser') \
+            .find('span', attrs={'class': ChannelExtractor.SUB_CNT_CLASS})
+        # the text of the span is parsed into a number the same way, before & after
+        subs = ChannelExtractor._ext_subs(str(span_elem))
+        vid_id_list = [
+            thumb['href'].split("=")[-1].strip()
+            for thumb in BeautifulSoup(channel_raw.uploads_html, 'html.parser')
+            .find_all('a', attrs={'class': ChannelExtractor.UPLOADED_THUMB_CLASS})
+        ]
+        return title, subs, vid_id_list
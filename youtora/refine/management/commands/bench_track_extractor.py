@@ -0,0 +1,100 @@
+import html
+import logging
+import time
+import tracemalloc
+from os import path
+from typing import Callable, List, Sized, Tuple
+
+import xmltodict
+from django.core.management.base import BaseCommand
+
+from youtora.collect.models import TracksRaw
+from youtora.refine.dataclasses import Track
+from youtora.refine.extractors import TrackExtractor
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "..", "..", "tests", "fixtures")
+
+
+class Command(BaseCommand):
+    HELP = 'benchmark TrackExtractor over the stored tracks raws, before & after streaming the xml into a TrackBatch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', '--num_tracks_raws', type=int, default=200,
+                            help="the number of stored tracks raws to parse")
+        parser.add_argument('--fixture_scale', type=int,
+                            help="parse the recorded caption repeated this many times, instead of the stored ones")
+
+    def handle(self, *args, **options):
+        logging.disable(logging.WARNING)  # the skipped tracks are not news here
+        if options['fixture_scale']:
+            with open(path.join(FIXTURES_DIR, "tracks_srv1.xml"), 'r') as fh:
+                head, body = fh.read().split("<transcript>")
+            corpus = [TracksRaw(caption_id="fixture", raw_xml=head + "<transcript>" + body.replace(
+                "</transcript>", "") * options['fixture_scale'] + "</transcript>")]
+        else:
+            corpus = [
+                tracks_raw
+                for tracks_raw in TracksRaw.objects.all()[:options['num_tracks_raws']]
+                if tracks_raw.raw_xml
+            ]
+        self.stdout.write("TrackExtractor (tracks_raws={}, xml={}KB):"
+                          .format(len(corpus), sum(len(tracks_raw.raw_xml) for tracks_raw in corpus) // 1000))
+        parses = [
+            # before: unescape the whole string, and build the whole transcript as a dict, then a Track per track
+            ("before", self._parse_with_xmltodict),
+            # stream the text elements into a batch, and build a Track per track out of it
+            ("parse", TrackExtractor.parse),
+            # stream the text elements into a batch
+            ("parse_batch", TrackExtractor.parse_batch)
+        ]
+        for name, parse in parses:
+            secs, peak, kept = self._measure(parse, corpus)
+            self.stdout.write("{}: {:.1f}ms, peak {:.1f}MB, kept {:.1f}MB"
+                              .format(name, secs * 1000, peak / 10 ** 6, kept / 10 ** 6))
+
+    @staticmethod
+    def _measure(parse: Callable[[TracksRaw], Sized], corpus: List[TracksRaw]) -> Tuple[float, int, int]:
+        """
+        :return: the total seconds, the peak memory of a single parse, and the largest memory kept by
+        the result of a single parse.
+        """
+        secs = 0.0
+        peak = 0
+        kept = 0
+        for tracks_raw in corpus:
+            start = time.perf_counter()
+            parse(tracks_raw)
+            secs += time.perf_counter() - start
+            tracemalloc.start()
+            result = parse(tracks_raw)
+            curr, curr_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, curr_peak)
+            kept = max(kept, curr)
+            tracemalloc.stop()
+            del result
+        return secs, peak, kept
+
+    @staticmethod
+    def _parse_with_xmltodict(tracks_raw: TracksRaw) -> List[Track]:
+        """
+        the parsing as it was done before.
+        """
+        texts = xmltodict.parse(html.unescape(tracks_raw.raw_xml))['transcript']['text']
+        if not isinstance(texts, list):
+            return list()
+        tracks = [
+            Track(caption_id=tracks_raw.caption_id, start=float(text["@start"]),
+                  duration=float(text["@dur"]), content=text["#text"])
+            for text in texts
+            if "@start" in text and "@dur" in text and "#text" in text
+        ]
+        for idx, track in enumerate(tracks):
+            if len(tracks) == 1:
+                break
+            prev_track = tracks[idx - 1] if idx > 0 else None
+            next_track = tracks[idx + 1] if idx < len(tracks) - 1 else None
+            track.prev_id = prev_track.id if prev_track else None
+            track.next_id = next_track.id if next_track else None
+            track.context = " ".join([prev_track.content if prev_track else "", track.content,
+                                      next_track.content if next_track else ""])
+        return tracks
@@ -0,0 +1,47 @@
+from os import path
+from unittest import TestCase
+
+from bs4 import BeautifulSoup
+
+from youtora.collect.models import ChannelRaw
+from youtora.refine.errors import ChannelInfoNotFoundError
+from youtora.refine.extractors import ChannelExtractor
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "fixtures")
+
+
+class ChannelExtractorTestCase(TestCase):
+    # recorded pages, as rendered by chrome
+    with open(path.join(FIXTURES_DIR, "channel_main_rendered.html"), 'r') as fh:
+        main_html = fh.read()
+    with open(path.join(FIXTURES_DIR, "channel_uploads_rendered.html"), 'r') as fh:
+        uploads_html = fh.read()
+
+    def test_parse(self):
+        channel_raw = ChannelRaw(_id="UCZCFT11CWBi3MHNlGf019nw", main_html=self.main_html,
+                                 uploads_html=self.uploads_html)
+        channel = ChannelExtractor.parse(channel_raw)
+        self.assertEqual("Abdul Bari", channel.title)
+        self.assertEqual(285000, channel.subs)
+        self.assertEqual(120, len(channel.vid_id_list))
+        self.assertNotIn("DECOYDECOY0", channel.vid_id_list)
+        self.assertNotIn("COMMENTED00", channel.vid_id_list)
+
+    def test_ext_subs_raises_without_subscriber_count(self):
+        with self.assertRaisesRegex(ChannelInfoNotFoundError, "UCZCFT11CWBi3MHNlGf019nw"):
+            ChannelExtractor._ext_subs("<html><title>Abdul Bari - YouTube</title></html>", "UCZCFT11CWBi3MHNlGf019nw")
+
+    def test_same_as_html_parser(self):
+        main_soup = BeautifulSoup(self.main_html, 'html.parser')
+        uploads_soup = BeautifulSoup(self.uploads_html, 'html.parser')
+        self.assertEqual(main_soup.find('title').text.split("-")[0].strip(),
+                         ChannelExtractor._ext_title(self.main_html))
+        self.assertEqual(main_soup.find('span', attrs={'class': ChannelExtractor.SUB_CNT_CLASS}).text,
+                         ChannelExtractor._parse_html(self.main_html).xpath(ChannelExtractor.SUB_CNT_XPATH)[0]
+                         .text_content())
+        thumbs = uploads_soup.find_all('a', attrs={'class': ChannelExtractor.UPLOADED_THUMB_CLASS})
+        self.assertEqual([thumb['href'].split("=")[-1].strip() for thumb in thumbs],
+                         ChannelExtractor._ext_video_id_list(self.uploads_html))
+
+    def test_ext_video_id_list_of_empty_html(self):
+        self.assertEqual(list(), ChannelExtractor._ext_video_id_list(""))
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from youtora.refine.contexts import ContextBuilder
+from youtora.refine.dataclasses import TrackBatch
+
+
+class ContextBuilderTestCase(TestCase):
+    STARTS = [0.0, 1.5, 2.0, 6.0, 7.5, 20.0]
+    CONTENTS = ["so", "today we", "are going to", "talk about", "sorting", "ok"]
+
+    def test_build_tracks_window(self):
+        batch = self._build_batch(ContextBuilder(num_tracks=2))
+        expected = [
+            " ".join(self.CONTENTS[max(0, idx - 2):idx + 3])
+            for idx in range(len(self.CONTENTS))
+        ]
+        self.assertEqual(expected, batch.get_contexts())
+
+    def test_build_secs_window(self):
+        batch = self._build_batch(ContextBuilder(secs=2.0))
+        expected = [
+            " ".join(content for start, content in zip(self.STARTS, self.CONTENTS) if abs(start - curr_start) <= 2.0)
+            for curr_start in self.STARTS
+        ]
+        self.assertEqual(expected, batch.get_contexts())
+        self.assertEqual("ok", batch.get_context(5))
+
+    def test_build_secs_window_of_unsorted_starts(self):
+        batch = TrackBatch.build("c", [0.0, 5.0, 1.0, 6.0], [1.0] * 4, ["a", "b", "c", "d"])
+        ContextBuilder(secs=1.5).build(batch)
+        self.assertEqual(["a c", "b d", "a c", "b d"], batch.get_contexts())
+
+    def test_build_rejects_negative_windows(self):
+        with self.assertRaises(ValueError):
+            ContextBuilder(num_tracks=-1)
+
+    def _build_batch(self, context_builder: ContextBuilder) -> TrackBatch:
+        batch = TrackBatch.build("c", self.STARTS, [1.0] * len(self.STARTS), self.CONTENTS)
+        context_builder.build(batch)
+        return batch
@@ -0,0 +1,68 @@
+import html
+from os import path
+from unittest import TestCase
+
+import xmltodict
+
+from youtora.collect.models import TracksRaw
+from youtora.refine.dataclasses import Track
+from youtora.refine.extractors import TrackExtractor
+
+FIXTURES_DIR = path.join(path.dirname(__file__), "fixtures")
+
+
+class TrackExtractorTestCase(TestCase):
+    # a recorded srv1 caption, with entities escaped twice, a track without dur and an empty track
+    with open(path.join(FIXTURES_DIR, "tracks_srv1.xml"), 'r') as fh:
+        raw_xml = fh.read()
+
+    def test_parse_same_as_xmltodict(self):
+        tracks = TrackExtractor.parse(TracksRaw(caption_id="0IAPZzGSbME|auto|en", raw_xml=self.raw_xml))
+        texts = xmltodict.parse(html.unescape(self.raw_xml))['transcript']['text']
+        expected = [
+            (float(text["@start"]), float(text["@dur"]), text["#text"])
+            for text in texts
+            if "@dur" in text and "#text" in text
+        ]
+        self.assertEqual(38, len(tracks))
+        self.assertEqual(expected, [(track.start, track.duration, track.content) for track in tracks])
+        self.assertEqual(tracks[1].id, tracks[0].next_id)
+        self.assertEqual(" ".join([tracks[0].content, tracks[1].content, tracks[2].content]), tracks[1].context)
+
+    def test_parse_unescapes_markup_as_text(self):
+        raw_xml = "<transcript><text start=\"0\" dur=\"1\">&amp;lt;b&amp;gt; Q&amp;amp;A</text>" \
+                  "<text start=\"1\" dur=\"1\">it&amp;#39;s</text></transcript>"
+        tracks = TrackExtractor.parse(TracksRaw(caption_id="c", raw_xml=raw_xml))
+        self.assertEqual(["Q&A", "it's"], [track.content for track in tracks])
+
+    def test_parse_strips_styled_tracks(self):
+        # an srv1 caption with styled tracks, and a track with nothing but markup
+        with open(path.join(FIXTURES_DIR, "tracks_srv1_styled.xml"), 'r') as fh:
+            raw_xml = fh.read()
+        tracks = TrackExtractor.parse(TracksRaw(caption_id="c", raw_xml=raw_xml))
+        self.assertEqual(["hello world", "so today we talk about sorting", "it's O(n log n) & 1 < 2"],
+                         [track.content for track in tracks])
+        self.assertEqual("hello world so today we talk about sorting", tracks[0].context)
+
+    def test_parse_ignores_single_track(self):
+        raw_xml = "<transcript><text start=\"0\" dur=\"1\">hello</text></transcript>"
+        self.assertEqual(list(), TrackExtractor.parse(TracksRaw(caption_id="c", raw_xml=raw_xml)))
+
+    def test_track_ids_are_stable(self):
+        # the ids are the ids of the general docs, so must not change across runs
+        track = Track(caption_id="0IAPZzGSbME|auto|en", start=1.5, duration=2.0, content="hello world")
+        self.assertEqual("0IAPZzGSbME|auto|en|0183a6eccce25a38", track.id)
+        self.assertNotEqual(track.id, Track(caption_id="0IAPZzGSbME|auto|en", start=1.6, duration=2.0,
+                                            content="hello world").id)
+
+    def test_parse_batch_matches_track_views(self):
+        batch = TrackExtractor.parse_batch(TracksRaw(caption_id="0IAPZzGSbME|auto|en", raw_xml=self.raw_xml))
+        tracks = list(batch)
+        self.assertEqual(len(batch), len(tracks))
+        self.assertEqual([track.id for track in tracks], batch.get_ids())
+        prev_ids, next_ids = batch.get_neighbour_ids()
+        self.assertEqual([track.prev_id for track in tracks], prev_ids)
+        self.assertEqual([track.next_id for track in tracks], next_ids)
+        self.assertIsNone(prev_ids[0])
+        self.assertIsNone(next_ids[-1])
+        self.assertEqual([track.context for track in tracks], batch.get_contexts())